@@ -1,6 +1,7 @@
 """Streamlit Connection for Amazon DynamoDB."""
 
 from .connection import DynamoDBConnection, DynamoDBConnectionApiType, DynamoDBItemType
+from .mapping import DynamoDBTableMapping
 from .table_editor import DynamoDBTableEditor
 
 __version__ = "0.1.5"
@@ -9,5 +10,6 @@ __all__ = [
     "DynamoDBConnection",
     "DynamoDBConnectionApiType",
     "DynamoDBItemType",
+    "DynamoDBTableMapping",
     "DynamoDBTableEditor"
 ]
@@ -1,20 +1,46 @@
 """Streamlit connection to an Amazon DynamoDB table."""
 
-from typing import Any,  Dict, Iterator, Iterable, Union, Literal, Optional, cast
+from typing import (
+    Any, Callable, Dict, Iterator, Iterable, List, Sequence, Union, Literal, Optional,
+    TYPE_CHECKING, cast
+)
 from datetime import timedelta
 
 from streamlit.connections import BaseConnection
 
-import boto3
-import pandas as pd
 import streamlit as st
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
 
-from dynamodb_mapping import DynamoDBMapping, DynamoDBKeySimplified, DynamoDBItemType  # type: ignore
-from .utils import boto3_session_from_config
+from dynamodb_mapping import DynamoDBKeySimplified, DynamoDBItemType  # type: ignore
+from .mapping import DynamoDBTableItemAccessor, DynamoDBTableMapping, _copy_item
+from .utils import (
+    TTLCache,
+    boto3_session_from_config,
+    create_tuple_keys,
+    get_default_session,
+    is_pandas_object,
+    projection_params,
+)
 
-DynamoDBConnectionApiType = Literal["raw", "pandas"]
+if TYPE_CHECKING:
+    # pandas and pyarrow are imported on first use, as they are not needed by the "raw" API and
+    # importing them takes a significant part of the startup time of an app.
+    import pandas as pd
+    import pyarrow as pa
 
-class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
+DynamoDBConnectionApiType = Literal["raw", "pandas", "arrow"]
+
+
+def _arrow_array(values: List[Any]) -> "pa.Array":
+    import pyarrow as pa
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # Mixed value types or DynamoDB sets, that have no arrow equivalent.
+        return pa.array([None if value is None else str(value) for value in values])
+
+
+class DynamoDBConnection(BaseConnection[DynamoDBTableMapping]):
     """Connects a streamlit app to an Amazon DynamoDB table.
 
     Example usage:
@@ -30,7 +56,16 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
         connection_name (str): the name of the connection
         api_type (DynamoDBConnectionApiType): the API type to be used. If set to "pandas", pandas
             dataframe or series will be returned by the methods. If set to "raw", raw python objects
-            (lists, dictionaries) will be returned. Defaults to "pandas".
+            (lists, dictionaries) will be returned. If set to "arrow", the items of the table will
+            be returned as pyarrow tables, with the key attributes in the first columns, that
+            Streamlit can display without converting them; single items are returned as pandas
+            series. Defaults to "pandas".
+        cache_ttl (float): The number of seconds the items retrieved with the "raw" API of
+            `get_item` are kept in the item cache of the connection. The cached items are
+            discarded by any write of the mapping of the connection, but not by the writes of
+            other clients of the table. The reads of the mapping itself are not cached. Set it to
+            0 to disable the item cache. Defaults to 30.
+        cache_size (int): The maximum number of items in the item cache. Defaults to 1024.
 
     Additionally, the following optional keyword arguments can be used to configure the underlying
     boto3 client:
@@ -41,19 +76,30 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
         - aws_secret_access_key (str): AWS Secret Access Key
         - aws_region (str): AWS region name
         - aws_profile (str): AWS profile name
+        - max_pool_connections (int): The maximum number of connections of the DynamoDB client,
+          that is also the maximum number of threads of a parallel scan or a bulk write.
+          Increase it to scan with more than 10 segments in parallel. Defaults to 10.
     """
     def __init__(self,
-        connection_name: str, api_type: DynamoDBConnectionApiType="pandas", **kwargs
+        connection_name: str,
+        api_type: DynamoDBConnectionApiType="pandas",
+        cache_ttl: float = 30,
+        cache_size: int = 1024,
+        **kwargs
     ) -> None:
         self.api_type = api_type
+        self._item_cache = (
+            TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_ttl > 0 and cache_size > 0
+            else None
+        )
         super().__init__(connection_name, **kwargs)
 
     @property
-    def mapping(self) -> DynamoDBMapping:
+    def mapping(self) -> DynamoDBTableMapping:
         """Access the underlying DynamoDBMapping for full API operations."""
         return self._instance
 
-    def _connect(self, **kwargs) -> DynamoDBMapping:
+    def _connect(self, **kwargs) -> DynamoDBTableMapping:
         secrets = self._secrets.to_dict()
         table_name = kwargs.get("table_name") or secrets.get("table_name")
         if table_name is None:
@@ -67,15 +113,78 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
             kwargs.get("boto3_session") or
             boto3_session_from_config(kwargs) or
             boto3_session_from_config(secrets) or
-            boto3.Session()
+            get_default_session()
+        )
+        max_pool_connections = (
+            kwargs.get("max_pool_connections") or secrets.get("max_pool_connections")
+        )
+        table = DynamoDBTableMapping(
+            table_name=table_name,
+            boto3_session=session,
+            max_pool_connections=int(max_pool_connections) if max_pool_connections else None,
         )
-        table = DynamoDBMapping(table_name=table_name, boto3_session=session)
         return table
 
-    def _df_from_iterable(self, iterable: Iterable[DynamoDBItemType]) -> pd.DataFrame:
-        df = pd.DataFrame(cast(Iterable[Dict[Any, Any]], iterable))
-        df.set_index(list(self.mapping.key_names), inplace=True)
-        return df
+    def _columns_from_iterable(
+        self, iterable: Iterable[DynamoDBItemType], missing: Any = None
+    ) -> Dict[str, List[Any]]:
+        # Build the columns in a single pass instead of materializing a list of rows first. The
+        # attributes missing from an item are filled with the missing value.
+        columns: Dict[str, List[Any]] = {name: [] for name in self.mapping.key_names}
+        n_rows = 0
+        for item in iterable:
+            for name, value in item.items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [missing] * n_rows
+                column.append(value)
+            n_rows += 1
+            if len(item) < len(columns):
+                for column in columns.values():
+                    if len(column) < n_rows:
+                        column.append(missing)
+        return columns
+
+    def _df_from_iterable(self, iterable: Iterable[DynamoDBItemType]) -> "pd.DataFrame":
+        import numpy as np
+        import pandas as pd
+        # The index is built from the key columns at construction time instead of set_index, that
+        # would copy the blocks of the dataframe to move the key columns out of them. The missing
+        # attributes are NaN, like in a dataframe built from a list of the items.
+        columns = self._columns_from_iterable(iterable, missing=np.nan)
+        key_names = self.mapping.key_names
+        if len(key_names) == 1:
+            index = pd.Index(columns.pop(key_names[0]), name=key_names[0])
+        else:
+            index = pd.MultiIndex.from_arrays(
+                [columns.pop(name) for name in key_names], names=key_names
+            )
+        return pd.DataFrame(columns, index=index)
+
+    def _arrow_from_iterable(self, iterable: Iterable[DynamoDBItemType]) -> "pa.Table":
+        import pyarrow as pa
+        # The key columns come first, as they can not be set as an index of an arrow table. The
+        # missing attributes are nulls.
+        columns = self._columns_from_iterable(iterable)
+        return pa.table({name: _arrow_array(values) for name, values in columns.items()})
+
+    def _series_from_item(self, item: DynamoDBItemType) -> "pd.Series":
+        import pandas as pd
+        # Key attributes first, followed by the other attributes in their original order.
+        key_names = self.mapping.key_names
+        index = [name for name in key_names if name in item]
+        index.extend(name for name in item if name not in key_names)
+        return pd.Series(
+            [item[name] for name in index], index=pd.Index(index, dtype=object), name="value"
+        )
+
+    def _chunks(
+        self, convert: Callable[[Iterable[DynamoDBItemType]], Any], **kwargs
+    ) -> Iterator[Any]:
+        # The pages of the scan are used as chunks, so no additional buffering is needed.
+        for page in self.mapping.scan_pages(**kwargs):
+            if page:
+                yield convert(page)
 
     def items(
         self,
@@ -83,46 +192,95 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
         api_type: Optional[DynamoDBConnectionApiType] = None,
         ttl: Optional[Union[float, int, timedelta]] = None,
         ignore_cache: bool = False,
+        total_segments: int = 1,
+        max_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        filter_expression: Optional[ConditionBase] = None,
         **kwargs
-    ) -> Union[Iterator[DynamoDBItemType], pd.DataFrame]:
+    ) -> Union[Iterator[DynamoDBItemType], "pd.DataFrame", "pa.Table", Iterator[Any]]:
         """Returns all items in the DynamoDB table.
 
-        The items can be returned either as a pandas dataframe (the default behavior) or as an
-        iterator of python dictionaries. If you have a huge table, it is highly recommended to
-        use the the dict iterator mode, otherwise DynamoDBConnection will try to read the whole
-        table into the memory. The iterator mode scans the successive pages of your table on-demand.
+        The items can be returned either as a pandas dataframe (the default behavior), as a pyarrow
+        table, or as an iterator of python dictionaries. If you have a huge table, it is highly
+        recommended to use the the dict iterator mode or to set `chunk_size`, otherwise
+        DynamoDBConnection will try to read the whole table into the memory. The iterator mode
+        scans the successive pages of your table on-demand.
 
         Args:
             api_type (Optional[DynamoDBConnectionApiType]): Specifies the return type of the
-                method: "pandas", "raw" or None. The default None will use the connection's api
-                configuration.
-            ttl (float, int, timedelta or None): If using "pandas" API, the maximum number of
-                seconds to keep results in the cache, or None if cached results should not expire.
-                The default is None. If using "raw" API, this argument is ignored.
+                method: "pandas", "arrow", "raw" or None. The default None will use the
+                connection's api configuration.
+            ttl (float, int, timedelta or None): If using "pandas" or "arrow" API, the maximum
+                number of seconds to keep results in the cache, or None if cached results should
+                not expire. The default is None. If using "raw" API, this argument is ignored.
             ignore_cache (bool): If set to True, no caching of the results will be done. Defaults
                 to False.
+            total_segments (int): The number of segments of the table to be scanned in parallel.
+                Defaults to 1 (serial scan). The order of the returned items is not defined if
+                it is greater than 1.
+            max_workers (Optional[int]): The maximum number of threads used by a parallel scan.
+                Defaults to `total_segments`, but at most the `max_pool_connections` of the
+                connection.
+            chunk_size (Optional[int]): If using "pandas" or "arrow" API and set, an iterator of
+                dataframes or pyarrow tables is returned instead of a single one. Each chunk holds
+                one page of the scan, that is at most `chunk_size` items. Chunked results are not
+                cached. If using "raw" API, this argument is ignored.
+            columns (Optional[Sequence[str]]): If set, only these attributes (and the key
+                attributes) of the items are read from the table.
+            filter_expression (Optional[ConditionBase]): A condition built with
+                `boto3.dynamodb.conditions.Attr`. If set, only the items that match the condition
+                are returned. The filtering is done by DynamoDB, but note that the filtered items
+                still consume read capacity.
             **kwargs: Optional keyword arguments to be passed to the underlying boto3 DynamoDB
                 scan operation.
 
-        Return (Union[Iterator[DynamoDBItemType], pd.DataFrame]): Either a pandas dataframe, or an
+        Return (Union[Iterator[DynamoDBItemType], pd.DataFrame, pa.Table, Iterator[Any]]): Either
+            a pandas dataframe, a pyarrow table, an iterator of dataframes or tables, or an
             iterator of python dictionaries.
         """
         api_type = api_type or self.api_type
-        if api_type == "pandas":
-            if ignore_cache:
-                iterator = self.mapping.scan(**kwargs)
-                return self._df_from_iterable(iterator)
-            else:
-                @st.cache_data(
-                    show_spinner="Running `dynamodb.scan(...)`.",
-                    ttl=ttl,
-                )
-                def _items(**kwargs):
-                    iterator = self.mapping.scan(**kwargs)
-                    return self._df_from_iterable(iterator)
-                return _items(**kwargs)
+        if columns is not None:
+            key_names = self.mapping.key_names
+            projection = projection_params(
+                [*key_names, *(c for c in columns if c not in key_names)], prefix="#c"
+            )
+            projection["ExpressionAttributeNames"].update(
+                kwargs.get("ExpressionAttributeNames", {})
+            )
+            kwargs = {**kwargs, **projection}
+        if filter_expression is not None:
+            # Built to a string here, as streamlit can not hash the condition objects.
+            built = ConditionExpressionBuilder().build_expression(filter_expression)
+            kwargs = {
+                **kwargs,
+                "FilterExpression": built.condition_expression,
+                "ExpressionAttributeNames": {
+                    **kwargs.get("ExpressionAttributeNames", {}),
+                    **built.attribute_name_placeholders,
+                },
+                "ExpressionAttributeValues": {
+                    **kwargs.get("ExpressionAttributeValues", {}),
+                    **built.attribute_value_placeholders,
+                },
+            }
+        scan_kwargs = {**kwargs, "total_segments": total_segments, "max_workers": max_workers}
+        if api_type == "raw":
+            return self.mapping.scan(**scan_kwargs)
+        convert = self._arrow_from_iterable if api_type == "arrow" else self._df_from_iterable
+        if chunk_size is not None:
+            # chunk_size overrides a Limit passed in kwargs, as it sets the same page size.
+            return self._chunks(convert, **{**scan_kwargs, "Limit": chunk_size})
+        if ignore_cache:
+            return convert(self.mapping.scan(**scan_kwargs))
         else:
-            return self.mapping.scan(**kwargs)
+            @st.cache_data(
+                show_spinner="Running `dynamodb.scan(...)`.",
+                ttl=ttl,
+            )
+            def _items(api_type, **kwargs):
+                return convert(self.mapping.scan(**kwargs))
+            return _items(api_type, **scan_kwargs)
 
     def get_item(self,
         keys: DynamoDBKeySimplified,
@@ -131,7 +289,7 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
         ttl: Optional[Union[float, int, timedelta]] = None,
         ignore_cache: bool = False,
         **kwargs
-    ) -> Union[DynamoDBItemType, pd.Series]:
+    ) -> Union[DynamoDBItemType, "pd.Series"]:
         """Retrieves a single item from the table.
 
         The value(s) of the item's key(s) should be specified.
@@ -144,7 +302,9 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
                 method: "pandas", "raw" or None. The default None will use the connection's api
                 configuration.
             ttl (float, int, timedelta or None): The maximum number of seconds to keep results in
-                the cache, or None if cached results should not expire. The default is None.
+                the cache, or None if cached results should not expire. The default is None. If
+                using "raw" API without keyword arguments, the item cache of the connection is
+                used and this argument is ignored.
             ignore_cache (bool): If set to True, no caching of the results will be done. Defaults
                 to False.
             **kwargs: keyword arguments to be passed to the underlying DynamoDB get_item operation.
@@ -160,7 +320,9 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
         api_type = api_type or self.api_type
         if ignore_cache:
             item = self.mapping.get_item(keys, **kwargs)
-            return item if api_type == "raw" else pd.Series(item, name="value")
+            return item if api_type == "raw" else self._series_from_item(item)
+        elif api_type == "raw" and self._item_cache is not None and not kwargs:
+            return self._get_cached_item(keys, self._item_cache)
         else:
             cache_message = "Running `dynamodb.get_item(...)`."
             if api_type == "raw":
@@ -171,11 +333,66 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
                 @st.cache_data(show_spinner=cache_message, ttl=ttl)
                 def _get_item(keys, **kwargs):
                     item = self.mapping.get_item(keys, **kwargs)
-                    return pd.Series(item, name="value")
+                    return self._series_from_item(item)
             return _get_item(keys, **kwargs)
 
+    def _get_cached_item(
+        self, keys: DynamoDBKeySimplified, cache: TTLCache
+    ) -> DynamoDBTableItemAccessor:
+        mapping = self.mapping
+        cache_key = create_tuple_keys(keys)
+        # Read before the item: if a write happens meanwhile, the cached item is already stale.
+        write_count = mapping.write_count
+        cached = cache.get(cache_key)
+        if cached is not None and cached[0] == write_count:
+            data = cached[1]
+        else:
+            data = dict(mapping.get_item(keys))
+            # Any write of the shared mapping discards the cached items, as the write count of
+            # the mapping changes.
+            cache.set(cache_key, (write_count, data))
+        # Copied, so that modifying the returned item does not modify the cached one.
+        return DynamoDBTableItemAccessor(
+            parent=mapping, item_keys=keys, initial_data=_copy_item(data)
+        )
+
+    def get_items(self,
+        keys: Iterable[DynamoDBKeySimplified],
+        *,
+        api_type: Optional[DynamoDBConnectionApiType] = None,
+        **kwargs
+    ) -> Union[Iterator[DynamoDBItemType], "pd.DataFrame", "pa.Table"]:
+        """Retrieves multiple items from the table.
+
+        The items are fetched with BatchGetItem operations, up to 100 items per request. The
+        results are not cached.
+
+        Args:
+            keys (Iterable[DynamoDBKeySimplified]): The key values of the items.
+            api_type (Optional[DynamoDBConnectionApiType]): Specifies the return type of the
+                method: "pandas", "arrow", "raw" or None. The default None will use the
+                connection's api configuration.
+            **kwargs: keyword arguments to be passed to `DynamoDBTableMapping.get_items`.
+
+        Raises:
+            ValueError: If the required key values are not specified.
+
+        Returns:
+            Union[Iterator[DynamoDBItemType], pd.DataFrame, pa.Table]: Either a pandas dataframe,
+                a pyarrow table, or an iterator of python dictionaries of the items found in the
+                table, in no particular order.
+        """
+        api_type = api_type or self.api_type
+        items = self.mapping.get_items(keys, **kwargs)
+        if api_type == "raw":
+            return items
+        elif api_type == "arrow":
+            return self._arrow_from_iterable(items)
+        else:
+            return self._df_from_iterable(items)
+
     def set_item(self,
-        keys: DynamoDBKeySimplified, item: Union[DynamoDBItemType, pd.Series], **kwargs
+        keys: DynamoDBKeySimplified, item: Union[DynamoDBItemType, "pd.Series"], **kwargs
     ) -> None:
         """Creates or overwrites a single item in the table.
 
@@ -187,15 +404,52 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
                 containing only object types supported by DynamoDB.
             **kwargs: keyword arguments to be passed to the underlying DynamoDB set_item operation.
         """
-        item_ = dict(item) if isinstance(item, pd.Series) else item
+        if is_pandas_object(item, "Series"):
+            # The converted dict is not shared: add the key attributes in place, so that the
+            # mapping does not copy it again.
+            item_ = dict(item)
+            item_.update(self.mapping._create_key_param(keys))
+        else:
+            item_ = item
         self.mapping.set_item(keys, cast(DynamoDBItemType, item_), **kwargs)
 
+    def set_items(self,
+        items: Union[Iterable[DynamoDBItemType], "pd.DataFrame"], **kwargs
+    ) -> None:
+        """Creates or overwrites multiple items in the table.
+
+        The items are written with concurrent BatchWriteItem operations, up to 25 items per
+        request.
+
+        Args:
+            items (Union[Iterable[DynamoDBItemType], pd.DataFrame]): Either an iterable of mappings,
+                each of them containing the key attributes of the item, or a pandas dataframe
+                indexed by the table keys, like the one returned by `items`. None and NaN values of
+                the dataframe are considered missing attributes. The items should contain only object
+                types supported by DynamoDB.
+            **kwargs: keyword arguments to be passed to `DynamoDBTableMapping.set_items`.
+        """
+        if is_pandas_object(items, "DataFrame"):
+            import pandas as pd
+            is_scalar, isna = pd.api.types.is_scalar, pd.isna
+            records = items.reset_index().to_dict("records")
+            # pandas fills the missing cells with NaN: only scalars are tested, as isna of a list
+            # or dict attribute is not a single boolean.
+            items = (
+                {
+                    name: value for name, value in record.items()
+                    if not (value is None or (is_scalar(value) and isna(value)))
+                }
+                for record in records
+            )
+        self.mapping.set_items(items, **kwargs)
+
     def put_item(self, keys: DynamoDBKeySimplified, item: DynamoDBItemType, **kwargs) -> None:
         """An alias of the `set_item` method."""
         self.set_item(keys, item, **kwargs)
 
     def modify_item(self,
-        keys: DynamoDBKeySimplified, modifications: Union[DynamoDBItemType, pd.Series], **kwargs
+        keys: DynamoDBKeySimplified, modifications: Union[DynamoDBItemType, "pd.Series"], **kwargs
     ) -> None:
         """Modifies an existing item in the table.
 
@@ -211,7 +465,7 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
             **kwargs: keyword arguments to be passed to the underlying DynamoDB update_item
                 operation.
         """
-        mods_ = dict(modifications) if isinstance(modifications, pd.Series) else modifications
+        mods_ = dict(modifications) if is_pandas_object(modifications, "Series") else modifications
         self.mapping.modify_item(keys, cast(DynamoDBItemType, mods_), **kwargs)
 
     def del_item(self, keys: DynamoDBKeySimplified, **kwargs) -> None:
@@ -223,3 +477,16 @@ class DynamoDBConnection(BaseConnection[DynamoDBMapping]):
                 partition key and the range key values, if both are specified in the key schema.
         """
         self.mapping.del_item(keys, **kwargs)
+
+    def del_items(self, keys: Iterable[DynamoDBKeySimplified], **kwargs) -> None:
+        """Deletes multiple items from the table.
+
+        The items are deleted with concurrent BatchWriteItem operations, up to 25 items per
+        request. Keys that are not in the table are ignored.
+
+        Args:
+            keys (Iterable[DynamoDBKeySimplified]): The key values, for example the index of a
+                dataframe returned by `items`.
+            **kwargs: keyword arguments to be passed to `DynamoDBTableMapping.del_items`.
+        """
+        self.mapping.del_items(keys, **kwargs)
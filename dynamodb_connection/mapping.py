@@ -0,0 +1,1574 @@
+"""DynamoDBMapping extended with the bulk and performance features used by DynamoDBConnection."""
+
+from typing import (
+    Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+)
+from collections.abc import ItemsView, KeysView, Mapping, ValuesView
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from decimal import Decimal
+from operator import itemgetter
+import asyncio
+import copy
+import functools
+import itertools
+import logging
+import math
+import queue
+import random
+import threading
+import time
+import warnings
+
+import boto3
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.transform import TransformationInjector, copy_dynamodb_params
+from boto3.dynamodb.types import TypeSerializer
+
+from dynamodb_mapping.dynamodb_mapping import (  # type: ignore
+    DynamoDBMapping,
+    DynamoDBKeySimplified,
+    DynamoDBItemType,
+    DynamoDBItemAccessor,
+    DynamoDBItemsView,
+    DynamoDBKeysView,
+    DynamoDBValuesView,
+    DynamoDBKeyAny,
+    DynamoDBKeyPrimitive,
+)
+from .utils import (
+    DynamoDBDeserializer,
+    TTLCache,
+    boto3_session_from_config,
+    create_tuple_keys,
+    get_default_session,
+    get_dynamodb_client,
+    get_dynamodb_resource,
+    get_table_descriptions,
+    projection_params,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+_MISSING = object()
+"""Sentinel of the missing default argument of `pop`."""
+
+_PLAIN_GET_ITEM_PARAMS = frozenset(("ConsistentRead", "ReturnConsumedCapacity"))
+"""GetItem parameters that do not contain attribute values or condition expressions."""
+
+_PLAIN_SCAN_PARAMS = frozenset((
+    "TableName", "IndexName", "ConsistentRead", "ReturnConsumedCapacity", "Select", "Limit",
+    "Segment", "TotalSegments", "ProjectionExpression", "ExpressionAttributeNames",
+))
+"""Scan parameters that do not contain attribute values or condition expressions."""
+
+_PLAIN_WRITE_PARAMS = frozenset((
+    "ReturnValues", "ReturnConsumedCapacity", "ReturnItemCollectionMetrics"
+))
+"""Write parameters that do not contain attribute values or condition expressions."""
+
+_SEGMENT_DONE = object()
+"""Sentinel put in the page queue by a background scan worker when its pages are exhausted."""
+
+_BATCH_GET_SIZE = 100
+"""The maximum number of keys in a BatchGetItem request."""
+
+_BATCH_WRITE_SIZE = 25
+"""The maximum number of items in a BatchWriteItem request."""
+
+_TRANSACT_WRITE_SIZE = 100
+"""The maximum number of operations in a TransactWriteItems request."""
+
+_TRANSACT_OPERATIONS = {"Put": "PutItem", "Update": "UpdateItem", "Delete": "DeleteItem"}
+"""The single item operations with the parameters of each kind of transactional write."""
+
+_SIMPLE_KEY_TYPES = frozenset((str, int, Decimal, bytes))
+"""The exact types of the simple key values converted by the specialized `_create_key_param`."""
+
+_MISSING_KEYS_CACHE_SIZE = 1024
+"""The maximum number of missing keys remembered by a view of DynamoDBTableMapping."""
+
+
+def _update_placeholders(count: int) -> Tuple[Tuple[str, str, str], ...]:
+    """Returns the (name placeholder, value placeholder, assignment) triples of `modify_item`."""
+    return tuple((f"#key{i}", f":value{i}", f"#key{i} = :value{i}") for i in range(count))
+
+
+_UPDATE_PLACEHOLDERS = _update_placeholders(128)
+"""Precomputed placeholders, covering the modifications of up to 128 attributes."""
+
+
+_MUTABLE_VALUE_TYPES = frozenset((dict, list, set))
+"""The types of the deserialized attribute values that can be modified in place."""
+
+
+def _copy_item(item: DynamoDBItemType) -> DynamoDBItemType:
+    """Copies a cached item, deep copying only the maps, lists and sets among its attributes.
+
+    Strings, numbers, binaries and booleans are immutable, so they are shared with the copy,
+    which is much faster than `copy.deepcopy` of the whole item.
+    """
+    return {
+        name: copy.deepcopy(value) if type(value) in _MUTABLE_VALUE_TYPES else value
+        for name, value in item.items()
+    }
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff delay in seconds before retrying unprocessed batch requests."""
+    return min(0.05 * 2 ** attempt, 5.0)
+
+
+def _log_keys(key_params: Dict[str, Any]) -> str:
+    """Formats the key values of an item like `dynamodb_mapping` does in its KeyError messages."""
+    values = list(key_params.values())
+    return str(values[0] if len(values) == 1 else values)
+
+
+def _projection_kwargs(
+    mapping: "DynamoDBTableMapping", projection: Optional[Sequence[str]]
+) -> Dict[str, Any]:
+    """Returns the read parameters retrieving the key attributes and the projected attributes."""
+    if projection is None:
+        return {}
+    # dict.fromkeys drops the duplicates, keeping the order.
+    return projection_params(dict.fromkeys([*mapping.key_names, *projection]))
+
+
+def _get_stored_item(
+    mapping: "DynamoDBTableMapping", keys: Any, **kwargs
+) -> Optional[DynamoDBItemType]:
+    """Returns the item stored under the keys, or None if there is no such item.
+
+    Like `get_item`, but the item is neither copied nor wrapped in an accessor, as the views only
+    compare it: the cached item itself may be returned, and it must not be modified.
+    """
+    try:
+        cache_key = create_tuple_keys(keys)
+        hash(cache_key)
+    except TypeError:
+        # Unhashable key values, like lists, dicts or sets, are not valid DynamoDB keys.
+        return None
+    try:
+        cache = mapping._item_cache
+        if cache is None or kwargs:
+            return mapping._get_item_data(keys, **mapping._read_params(False, kwargs))
+        data = cache.get(cache_key)
+        if data is None:
+            data = mapping._get_item_data(keys, **mapping._read_params(False, kwargs))
+            cache.set(cache_key, data)
+        return data
+    except (KeyError, ValueError):
+        return None
+    except ClientError as e:
+        # Key values of the wrong type
+        if e.response["Error"]["Code"] == "ValidationException":
+            return None
+        raise
+
+
+class DynamoDBTableItemAccessor(DynamoDBItemAccessor):
+    """DynamoDBItemAccessor that can write several modified fields with a single UpdateItem.
+
+    By default each assigned field is written immediately, like in DynamoDBItemAccessor. Inside a
+    `with` block the assignments are collected, and written by one UpdateItem operation when the
+    block exits or `flush` is called:
+
+        with mapping["my_key"] as item:
+            item["a"] = 1
+            item["b"] = 2
+
+    `update` writes all of its fields with one UpdateItem operation also outside a `with` block.
+
+    Args:
+        parent (DynamoDBTableMapping): The parent mapping that created this accessor.
+        item_keys (DynamoDBKeySimplified): The keys of the item this accessor is modifying.
+        initial_data (Dict): The initial item data.
+    """
+
+    def __init__(
+        self,
+        parent: "DynamoDBTableMapping",
+        item_keys: DynamoDBKeySimplified,
+        initial_data: DynamoDBItemType,
+    ) -> None:
+        super().__init__(parent, item_keys, initial_data)
+        self._pending: Dict[str, Any] = {}
+        self._autoflush = True
+
+    def __setitem__(self, __key: Any, __value: Any) -> None:
+        if self._autoflush:
+            self._parent.modify_item(self._item_keys, {__key: __value})
+        else:
+            self._pending[__key] = __value
+        dict.__setitem__(self, __key, __value)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:  # type: ignore
+        modifications = dict(*args, **kwargs)
+        if self._autoflush:
+            if modifications:
+                self._parent.modify_item(self._item_keys, modifications)
+        else:
+            self._pending.update(modifications)
+        dict.update(self, modifications)
+
+    def flush(self) -> None:
+        """Writes the fields assigned since the last write with a single UpdateItem operation."""
+        if self._pending:
+            self._parent.modify_item(self._item_keys, self._pending)
+            self._pending = {}
+
+    def __enter__(self) -> "DynamoDBTableItemAccessor":
+        self._autoflush = False
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._autoflush = True
+        self.flush()
+
+
+class DynamoDBTableTransaction:
+    """Collects the writes of a mapping and executes them with TransactWriteItems operations.
+
+    DynamoDB does not accept several operations on the same item in a transaction, so the writes
+    of the same key are merged: a modification after a put updates the item to be put, several
+    modifications are combined into one UpdateItem, and a put or delete replaces the previous
+    operation. Writes with additional parameters, like a ConditionExpression, can not be merged
+    and raise ValueError.
+
+    The writes are sent in transactions of 100 operations, the maximum allowed by DynamoDB: if
+    more writes are collected, only the writes within each group of 100 are atomic. Reads inside
+    the `with` block do not see the collected writes. `del_item` does not check the existence of
+    the item in a transaction. The bulk writes (`set_items`, `del_items`, `update` and `clear`)
+    and `pop` and `popitem` can not be collected, and raise RuntimeError in a transaction.
+
+    Args:
+        mapping (DynamoDBTableMapping): The mapping whose writes are collected.
+    """
+
+    def __init__(self, mapping: "DynamoDBTableMapping") -> None:
+        self._mapping = mapping
+        self._operations: Dict[Tuple[Any, ...], Tuple[str, Any, Any, Dict[str, Any]]] = {}
+
+    def __enter__(self) -> "DynamoDBTableTransaction":
+        local = self._mapping._local
+        if getattr(local, "transaction", None) is not None:
+            raise RuntimeError("A transaction of this mapping is already active in this thread.")
+        local.transaction = self
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        self._mapping._local.transaction = None
+        if exc_type is None:
+            self.commit()
+        else:
+            self._operations = {}
+
+    def _add(
+        self, keys: DynamoDBKeySimplified, kind: str, payload: Any, kwargs: Dict[str, Any]
+    ) -> None:
+        tuple_keys = create_tuple_keys(keys)
+        previous = self._operations.get(tuple_keys)
+        if previous is not None:
+            previous_kind, _, previous_payload, previous_kwargs = previous
+            if previous_kwargs or kwargs:
+                raise ValueError(
+                    f"Can not merge the operations with additional parameters on {keys} item in "
+                    "a transaction."
+                )
+            if kind == "Update" and previous_kind == "Put":
+                item = dict(previous_payload)
+                for name, value in payload.items():
+                    if value is None:
+                        item.pop(name, None)
+                    else:
+                        item[name] = value
+                kind, payload = "Put", item
+            elif kind == "Update" and previous_kind == "Update":
+                payload = {**previous_payload, **payload}
+            elif kind == "Update":
+                # Updating a deleted item creates it with the key and the modified attributes.
+                kind, payload = "Put", self._mapping._with_key_attributes(
+                    keys, {name: value for name, value in payload.items() if value is not None}
+                )
+        self._operations[tuple_keys] = (kind, keys, payload, kwargs)
+
+    def commit(self) -> None:
+        """Writes the collected operations, and starts collecting new ones."""
+        operations, self._operations = self._operations, {}
+        mapping = self._mapping
+        transact_items = []
+        for kind, keys, payload, kwargs in operations.values():
+            # The return values of the single item operations are not supported in transactions.
+            kwargs = {
+                name: value for name, value in kwargs.items() if name not in _PLAIN_WRITE_PARAMS
+            }
+            key_params = mapping._create_key_param(keys)
+            if kind == "Put":
+                params = {**kwargs, "TableName": mapping._table_name, "Item": payload}
+            elif kind == "Update":
+                params = mapping._update_params(key_params, payload, kwargs)
+            else:
+                params = {**kwargs, "TableName": mapping._table_name, "Key": key_params}
+            # Serialized as a single item operation: boto3 would add the names and values of a
+            # condition object to the top level of the TransactWriteItems parameters.
+            transact_items.append(
+                {kind: mapping._serialize_params(_TRANSACT_OPERATIONS[kind], params)}
+            )
+        try:
+            for start in range(0, len(transact_items), _TRANSACT_WRITE_SIZE):
+                logger.debug(
+                    "Performing a transact_write_items operation on %s table",
+                    mapping._table_name
+                )
+                mapping._client.transact_write_items(
+                    TransactItems=transact_items[start:start + _TRANSACT_WRITE_SIZE]
+                )
+        finally:
+            if operations:
+                for _, keys, _, _ in operations.values():
+                    mapping._invalidate_item(keys)
+                mapping._mark_written()
+
+
+class _MissingKeys:
+    """The keys that a view did not find in the table, forgotten after any write of the mapping.
+
+    Args:
+        mapping (DynamoDBTableMapping): The mapping of the view.
+    """
+
+    def __init__(self, mapping: "DynamoDBTableMapping") -> None:
+        self._mapping = mapping
+        # Insertion ordered: the oldest keys are dropped first.
+        self._keys: Dict[Tuple[Any, ...], None] = {}
+        self._write_count = mapping._write_count
+
+    def __contains__(self, tuple_keys: Tuple[Any, ...]) -> bool:
+        if self._write_count != self._mapping._write_count:
+            self._keys.clear()
+            self._write_count = self._mapping._write_count
+        return tuple_keys in self._keys
+
+    def add(self, tuple_keys: Tuple[Any, ...]) -> None:
+        if len(self._keys) >= _MISSING_KEYS_CACHE_SIZE:
+            del self._keys[next(iter(self._keys))]
+        self._keys[tuple_keys] = None
+
+
+def _contains_stored_item(
+    view: Any, keys: Any, value: Mapping, read_kwargs: Dict[str, Any]
+) -> bool:
+    """Compares value to the item stored under the keys, remembering the keys not found."""
+    try:
+        tuple_keys: Optional[Tuple[Any, ...]] = create_tuple_keys(keys)
+        if tuple_keys in view._missing_keys:
+            return False
+    except TypeError:
+        # Unhashable key values: not remembered.
+        tuple_keys = None
+    stored = _get_stored_item(view._mapping, keys, **read_kwargs)
+    if stored is None:
+        if tuple_keys is not None:
+            view._missing_keys.add(tuple_keys)
+        return False
+    return stored == value
+
+
+class DynamoDBTableValuesView(DynamoDBValuesView):
+    """DynamoDBValuesView that looks up the items by their key instead of scanning the table.
+
+    Like DynamoDBTableKeysView, the view remembers the keys that were not found in the table.
+
+    Args:
+        mapping (DynamoDBTableMapping): The mapping of the view.
+        projection (Optional[Sequence[str]]): If set, the items of the view contain only these
+            attributes and the key attributes.
+        total_segments (Optional[int]): The number of segments scanned in parallel when iterating
+            over the view. Defaults to the `total_segments` of the mapping.
+    """
+
+    def __init__(
+        self,
+        mapping: "DynamoDBTableMapping",
+        projection: Optional[Sequence[str]] = None,
+        total_segments: Optional[int] = None,
+    ) -> None:
+        super().__init__(mapping)
+        self._read_kwargs = _projection_kwargs(mapping, projection)
+        self._total_segments = total_segments or mapping.total_segments
+        self._missing_keys = _MissingKeys(mapping)
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, Mapping):
+            return False
+        try:
+            keys = self._mapping._get_key(value)
+        except KeyError:
+            return False
+        return _contains_stored_item(self, keys, value, self._read_kwargs)
+
+    def __iter__(self) -> Iterator[DynamoDBItemType]:
+        # Flattens the pages without a Python level generator frame per item.
+        return itertools.chain.from_iterable(self._mapping.scan_pages(
+            total_segments=self._total_segments, **self._read_kwargs
+        ))
+
+
+class DynamoDBTableKeysView(DynamoDBKeysView):
+    """DynamoDBKeysView that checks the existence of a key without retrieving the whole item.
+
+    The view remembers the keys that were not found in the table, so that testing the same
+    missing keys repeatedly (for example in a loop) does not send a request each time. The
+    remembered keys are forgotten after any write of the mapping, but not after the writes of
+    other clients of the table: create a new view with `keys()` to see them.
+
+    Args:
+        mapping (DynamoDBTableMapping): The mapping of the view.
+    """
+
+    def __init__(self, mapping: "DynamoDBTableMapping") -> None:
+        super().__init__(mapping)
+        self._missing_keys = _MissingKeys(mapping)
+
+    def __contains__(self, key: object) -> bool:
+        mapping = self._mapping
+        try:
+            tuple_keys = create_tuple_keys(key)
+            if tuple_keys in self._missing_keys:
+                return False
+        except TypeError:
+            # Unhashable key values: not remembered.
+            return mapping._has_item(key)
+        if mapping._has_item(key):
+            return True
+        self._missing_keys.add(tuple_keys)
+        return False
+
+
+class DynamoDBTableItemsView(DynamoDBItemsView):
+    """DynamoDBItemsView that extracts the keys of the scanned items with a precomputed getter.
+
+    Like DynamoDBTableKeysView, the view remembers the keys that were not found in the table.
+
+    Args:
+        mapping (DynamoDBTableMapping): The mapping of the view.
+        projection (Optional[Sequence[str]]): If set, the items of the view contain only these
+            attributes and the key attributes.
+        total_segments (Optional[int]): The number of segments scanned in parallel when iterating
+            over the view. Defaults to the `total_segments` of the mapping.
+    """
+
+    def __init__(
+        self,
+        mapping: "DynamoDBTableMapping",
+        projection: Optional[Sequence[str]] = None,
+        total_segments: Optional[int] = None,
+    ) -> None:
+        super().__init__(mapping)
+        self._read_kwargs = _projection_kwargs(mapping, projection)
+        self._total_segments = total_segments or mapping.total_segments
+        self._missing_keys = _MissingKeys(mapping)
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, tuple) or len(item) != 2:
+            return False
+        keys, value = item
+        if not isinstance(value, Mapping):
+            return False
+        try:
+            key_params = self._mapping._create_key_param(keys)
+        except ValueError:
+            return False
+        # The stored items contain their key attributes: decided without a request if they differ.
+        if not key_params.items() <= value.items():
+            return False
+        return _contains_stored_item(self, keys, value, self._read_kwargs)
+
+    def __iter__(self) -> Iterator[Tuple[DynamoDBKeySimplified, DynamoDBItemType]]:
+        get_key = self._mapping._get_key
+        pages = self._mapping.scan_pages(
+            total_segments=self._total_segments, **self._read_kwargs
+        )
+        # The key-item pairs of each page are built by zip and map, and flattened by chain,
+        # without a Python level loop. No frame holds a consumed page while the next one is
+        # requested.
+        return itertools.chain.from_iterable(map(
+            lambda page: zip(map(get_key, page), page), pages
+        ))
+
+
+class DynamoDBTableMapping(DynamoDBMapping):
+    """A DynamoDBMapping with parallel scan support.
+
+    All operations use the low-level boto3 DynamoDB client instead of the resource interface: the
+    parameters are serialized once per request (once per scan for the scan operations), and the
+    items are deserialized with a single reused DynamoDBDeserializer. The `table` resource is not
+    used by the mapping itself, so it is only created when it is first accessed.
+
+    Reads are eventually consistent, except the first read after a write operation of this
+    mapping, that is strongly consistent so that the write is always visible. You can request a
+    strongly consistent read with the `force_consistent` argument of `get_item` and `scan`, or by
+    passing the `ConsistentRead` parameter explicitly.
+
+    Args:
+        table_name (str): The name of the DynamoDB table.
+        boto3_session (Optional[boto3.Session]): An optional preconfigured boto3 Session object.
+        total_segments (int): The number of segments scanned in parallel when iterating over the
+            keys, values or items of the mapping. Defaults to 1, that is a sequential scan.
+        cache_size (int): The maximum number of items kept in the least recently used item cache
+            of `get_item`. The cache is invalidated by the writes of this mapping, but not by the
+            writes of other clients of the table. Defaults to 0, that disables the cache.
+        cache_ttl (Optional[float]): The number of seconds the items are kept in the item cache,
+            or None if they should not expire. Defaults to None.
+        max_pool_connections (Optional[int]): The maximum number of connections of the DynamoDB
+            client, that is also the maximum number of worker threads of a parallel scan or a bulk
+            write. Increase it if you scan with many segments or write with many workers.
+            Defaults to None, that is `total_segments`, but at least 10.
+        **kwargs: Additional keyword parameters passed to DynamoDBMapping.
+    """
+
+    item_count_ttl: float = 300
+    """The number of seconds the approximate item count of the table is cached for."""
+
+    def __init__(
+        self,
+        table_name: str,
+        boto3_session: Optional[boto3.Session] = None,
+        total_segments: int = 1,
+        cache_size: int = 0,
+        cache_ttl: Optional[float] = None,
+        max_pool_connections: Optional[int] = None,
+        **kwargs
+    ) -> None:
+        # DynamoDBMapping.__init__ is not called: it would create a new resource for each mapping.
+        session = (
+            boto3_session or
+            boto3_session_from_config(kwargs) or
+            get_default_session()
+        )
+        # The table resource is created on demand by the table property.
+        self._session = session
+        self._table: Any = None
+        # Read by every request: a plain attribute, not the identifier property of the resource.
+        self._table_name = table_name
+        # The worker threads of the parallel scans and the bulk writes are limited to the size of
+        # the connection pool, as the additional threads would only wait for a free connection.
+        self._max_pool_connections = max_pool_connections or max(10, total_segments)
+        self._client = get_dynamodb_client(session, self._max_pool_connections)
+        self._table_descriptions = get_table_descriptions(session)
+        cached = self._table_descriptions.get(table_name)
+        description = (
+            self._apply_description(*cached) if cached is not None else self._describe_table()
+        )
+        schema = {s["KeyType"]: s["AttributeName"] for s in description["KeySchema"]}
+        self.key_names = (schema["HASH"],) + ((schema["RANGE"],) if "RANGE" in schema else ())
+        self.total_segments = total_segments
+        # Placeholders for the key names, as they can be reserved words like "Name" or "Status".
+        self._key_projection = projection_params(self.key_names)
+        # The existence of an item is decided by its hash key alone.
+        self._hash_key_projection = projection_params(self.key_names[:1])
+        self._item_cache = (
+            TTLCache(cache_size, math.inf if cache_ttl is None else cache_ttl)
+            if cache_size > 0 else None
+        )
+        # Paginators are stateless, the page iterators created by paginate() hold the state.
+        self._scan_paginator = self._client.get_paginator("scan")
+        self._deserializer = DynamoDBDeserializer()
+        self._serializer = TypeSerializer()
+        self._single_key = len(self.key_names) == 1
+        # Returns the simplified key of an item: a primitive for simple, a tuple for composite keys.
+        self._get_key = itemgetter(*self.key_names)
+        self._key_values_from_item = self._specialized_key_values_factory()
+        self._create_key_param = self._specialized_key_param_factory()
+        self._needs_consistent = False
+        self._write_count = 0
+        # The transaction collecting the writes of each thread, see `transaction`.
+        self._local = threading.local()
+
+    @property
+    def table(self) -> Any:
+        """The boto3 Table resource of the table, created on the first access."""
+        if self._table is None:
+            self._table = get_dynamodb_resource(self._session).Table(self._table_name)
+        return self._table
+
+    @property
+    def table_name(self) -> str:
+        """The name of the DynamoDB table."""
+        return self._table_name
+
+    @property
+    def write_count(self) -> int:
+        """The number of write operations performed by this mapping.
+
+        It changes after every write of the mapping, so it can be used in the key of caches of
+        the table contents. The writes of other clients of the table are not counted.
+        """
+        return self._write_count
+
+    def _create_key_param(self, keys: DynamoDBKeySimplified) -> Dict[str, DynamoDBKeyPrimitive]:
+        tuple_keys = create_tuple_keys(keys)
+        if len(tuple_keys) != len(self.key_names):
+            raise ValueError(f"You must provide a value for each of {self.key_names} keys.")
+        return dict(zip(self.key_names, tuple_keys))
+
+    def _specialized_key_param_factory(
+        self
+    ) -> Callable[[DynamoDBKeySimplified], Dict[str, DynamoDBKeyPrimitive]]:
+        """Returns a `_create_key_param` specialized for the key schema of the table.
+
+        The common key formats, a str, int, Decimal or bytes or a 1-tuple of them for simple and a
+        pair for composite keys, are converted without the generic length check and zip; anything
+        else falls back to it.
+        """
+        # The generic method of the class, as the specialized one shadows it on the instance.
+        create_key_param = functools.partial(type(self)._create_key_param, self)
+        if self._single_key:
+            (hash_key,) = self.key_names
+
+            def create_simple_key_param(keys):
+                keys_type = type(keys)
+                if keys_type in _SIMPLE_KEY_TYPES:
+                    return {hash_key: keys}
+                # The tuple keys of the item cache and of create_tuple_keys.
+                if keys_type is tuple and len(keys) == 1:
+                    return {hash_key: keys[0]}
+                return create_key_param(keys)
+            return create_simple_key_param
+
+        hash_key, range_key = self.key_names
+
+        def create_composite_key_param(keys):
+            if type(keys) is tuple and len(keys) == 2:
+                return {hash_key: keys[0], range_key: keys[1]}
+            return create_key_param(keys)
+        return create_composite_key_param
+
+    def _read_params(self, force_consistent: bool, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Adds ConsistentRead to the parameters of a read if the last operation was a write."""
+        consistent = force_consistent or self._needs_consistent
+        self._needs_consistent = False
+        # Global secondary indexes do not support strongly consistent reads.
+        if consistent and "ConsistentRead" not in kwargs and "IndexName" not in kwargs:
+            return {**kwargs, "ConsistentRead": True}
+        return kwargs
+
+    def get_item(
+        self,
+        keys: DynamoDBKeySimplified,
+        force_consistent: bool = False,
+        ignore_cache: bool = False,
+        **kwargs
+    ) -> Any:
+        """Retrieves a single item from the table.
+
+        If the item cache is enabled, calls without additional keyword arguments are served from
+        the cache when possible. Strongly consistent reads always bypass the cache.
+
+        Args:
+            keys (DynamoDBKeySimplified): The key value of the item.
+            force_consistent (bool): Use a strongly consistent read even if the mapping was not
+                written since the last read. Defaults to False.
+            ignore_cache (bool): Retrieve the item from the table even if it is in the item cache.
+                The retrieved item still replaces the cached one. Defaults to False.
+            **kwargs: keyword arguments to be passed to the underlying DynamoDB get_item operation.
+
+        Raises:
+            ValueError: If the required key values are not specified.
+            KeyError: If no item can be found under this key in the table.
+
+        Returns:
+            DynamoDBTableItemAccessor: A dictionary wrapper over a single item from the table.
+        """
+        if self._item_cache is None or kwargs:
+            data = self._get_item_data(keys, **self._read_params(force_consistent, kwargs))
+            return DynamoDBTableItemAccessor(parent=self, item_keys=keys, initial_data=data)
+        cache_key = create_tuple_keys(keys)
+        data = None if force_consistent or ignore_cache else self._item_cache.get(cache_key)
+        if data is None:
+            data = self._get_item_data(keys, **self._read_params(force_consistent, kwargs))
+            self._item_cache.set(cache_key, data)
+        # Copied, so that modifying the returned item does not modify the cached one.
+        return DynamoDBTableItemAccessor(
+            parent=self, item_keys=keys, initial_data=_copy_item(data)
+        )
+
+    def _get_item_data(self, keys: DynamoDBKeySimplified, **kwargs) -> DynamoDBItemType:
+        key_params = self._create_key_param(keys)
+        logger.debug("Performing a get_item operation on %s table", self._table_name)
+        if kwargs.keys() <= _PLAIN_GET_ITEM_PARAMS:
+            # Only the key values need to be serialized: skip the generic parameter transformation.
+            response = self._client.get_item(
+                TableName=self._table_name, Key=self._serialize_item(key_params), **kwargs
+            )
+        else:
+            response = self._client.get_item(**self._serialize_params(
+                "GetItem", {**kwargs, "TableName": self._table_name, "Key": key_params}
+            ))
+        if "Item" not in response:
+            raise KeyError(_log_keys(key_params))
+        return self._deserializer.deserialize_item(response["Item"])
+
+    def transaction(self) -> "DynamoDBTableTransaction":
+        """Returns a context manager that writes the items with TransactWriteItems operations.
+
+        Inside the `with` block, `set_item`, `modify_item` and `del_item` of the current thread
+        (and the `mapping[key] = item` and `del mapping[key]` statements) are collected, and
+        written all at once when the block exits without an exception:
+
+            with mapping.transaction():
+                mapping["a"] = {"count": 1}
+                mapping.modify_item("b", {"count": 2})
+                del mapping["c"]
+
+        See DynamoDBTableTransaction for the details.
+        """
+        return DynamoDBTableTransaction(self)
+
+    def _check_no_transaction(self, operation: str) -> None:
+        """Raises RuntimeError if a transaction is active, for the writes it can not collect."""
+        if getattr(self._local, "transaction", None) is not None:
+            raise RuntimeError(f"{operation}() can not be used in a transaction.")
+
+    def _mark_written(self) -> None:
+        """Makes the next read strongly consistent and invalidates the missing keys of the views."""
+        self._needs_consistent = True
+        self._write_count += 1
+
+    def _serialize_item(self, item: DynamoDBItemType) -> Dict[str, Any]:
+        """Converts an item or key to DynamoDB AttributeValues with the reused TypeSerializer."""
+        serialize = self._serializer.serialize
+        return {name: serialize(value) for name, value in item.items()}
+
+    def _invalidate_item(self, keys: DynamoDBKeySimplified) -> None:
+        if self._item_cache is not None:
+            self._item_cache.pop(create_tuple_keys(keys))
+
+    def set_item(self, keys: DynamoDBKeySimplified, item: DynamoDBItemType, **kwargs) -> None:
+        item = self._with_key_attributes(keys, item)
+        transaction = getattr(self._local, "transaction", None)
+        if transaction is not None:
+            transaction._add(keys, "Put", item, kwargs)
+            return
+        logger.debug("Performing a put_item operation on %s table", self._table_name)
+        if kwargs.keys() <= _PLAIN_WRITE_PARAMS:
+            # Only the item needs to be serialized: skip the generic parameter transformation,
+            # that also deep copies the item.
+            self._client.put_item(
+                TableName=self._table_name, Item=self._serialize_item(item), **kwargs
+            )
+        else:
+            self._client.put_item(**self._serialize_params(
+                "PutItem", {**kwargs, "TableName": self._table_name, "Item": item}
+            ))
+        self._invalidate_item(keys)
+        self._mark_written()
+
+    def modify_item(
+        self, keys: DynamoDBKeySimplified, modifications: DynamoDBItemType, **kwargs
+    ) -> None:
+        key_params = self._create_key_param(keys)
+        if not modifications:
+            warning_msg = (
+                "No update expression was created by modify_item: modifications mapping is empty?"
+            )
+            warnings.warn(warning_msg, UserWarning)
+            logger.warning(warning_msg)
+            return
+        transaction = getattr(self._local, "transaction", None)
+        if transaction is not None:
+            transaction._add(keys, "Update", dict(modifications), kwargs)
+            return
+        params = self._update_params(key_params, modifications, kwargs)
+        logger.debug(
+            "Performing an update_item operation on %s table with update expression %s",
+            self._table_name, params["UpdateExpression"]
+        )
+        if kwargs.keys() <= _PLAIN_WRITE_PARAMS:
+            # Only the key and the new values need to be serialized: skip the generic parameter
+            # transformation, that also deep copies the values.
+            params["Key"] = self._serialize_item(key_params)
+            if "ExpressionAttributeValues" in params:
+                params["ExpressionAttributeValues"] = self._serialize_item(
+                    params["ExpressionAttributeValues"]
+                )
+            self._client.update_item(**params)
+        else:
+            self._client.update_item(**self._serialize_params("UpdateItem", params))
+        self._invalidate_item(keys)
+        self._mark_written()
+
+    def _update_params(
+        self,
+        key_params: Dict[str, DynamoDBKeyPrimitive],
+        modifications: DynamoDBItemType,
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Builds the UpdateItem parameters of `modify_item`, before serialization."""
+        set_parts: List[str] = []
+        remove_parts: List[str] = []
+        names: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+        placeholders = (
+            _UPDATE_PLACEHOLDERS if len(modifications) <= len(_UPDATE_PLACEHOLDERS)
+            else _update_placeholders(len(modifications))
+        )
+        for (name_ph, value_ph, assignment), (name, value) in zip(
+            placeholders, modifications.items()
+        ):
+            names[name_ph] = name
+            if value is None:
+                remove_parts.append(name_ph)
+            else:
+                set_parts.append(assignment)
+                values[value_ph] = value
+        expression_parts = []
+        if set_parts:
+            expression_parts.append("set " + ", ".join(set_parts))
+        if remove_parts:
+            expression_parts.append("remove " + ", ".join(remove_parts))
+        params = {
+            **kwargs,
+            "TableName": self._table_name,
+            "Key": key_params,
+            "UpdateExpression": " ".join(expression_parts),
+            "ExpressionAttributeNames": {**kwargs.get("ExpressionAttributeNames", {}), **names},
+        }
+        if values:
+            params["ExpressionAttributeValues"] = {
+                **kwargs.get("ExpressionAttributeValues", {}), **values
+            }
+        return params
+
+    def del_item(self, keys: DynamoDBKeySimplified, check_existing=True, **kwargs) -> None:
+        """Deletes a single item from the table.
+
+        If `check_existing` is set, the existence of the item is checked by a condition of the
+        DeleteItem operation, instead of retrieving the item first. A `ConditionExpression` passed
+        by the caller is combined with this condition: if it fails on an existing item, the
+        ConditionalCheckFailedException of DynamoDB is raised instead of KeyError.
+
+        Args:
+            keys (DynamoDBKeySimplified): The key value of the item.
+            check_existing (bool): Raise KeyError if the key does not exist in the table.
+                Defaults to True.
+            **kwargs: keyword arguments to be passed to the underlying DynamoDB delete_item
+                operation.
+
+        Raises:
+            KeyError: If `check_existing` is set and no item can be found under this key.
+        """
+        key_params = self._create_key_param(keys)
+        transaction = getattr(self._local, "transaction", None)
+        if transaction is not None:
+            transaction._add(keys, "Delete", {}, kwargs)
+            return
+        params = {**kwargs, "TableName": self._table_name, "Key": key_params}
+        if check_existing:
+            condition = kwargs.get("ConditionExpression")
+            if condition is None:
+                params["ConditionExpression"] = "attribute_exists(#hash_key)"
+            elif isinstance(condition, str):
+                params["ConditionExpression"] = f"({condition}) AND attribute_exists(#hash_key)"
+            else:
+                params["ConditionExpression"] = condition & Attr(self.key_names[0]).exists()
+            if condition is None or isinstance(condition, str):
+                params["ExpressionAttributeNames"] = {
+                    **kwargs.get("ExpressionAttributeNames", {}), "#hash_key": self.key_names[0]
+                }
+            if condition is not None:
+                # The existing item is returned if the condition of the caller failed on it.
+                params.setdefault("ReturnValuesOnConditionCheckFailure", "ALL_OLD")
+        logger.debug("Performing a delete_item operation on %s table", self._table_name)
+        try:
+            self._client.delete_item(**self._serialize_params("DeleteItem", params))
+        except ClientError as e:
+            if (
+                check_existing
+                and e.response["Error"]["Code"] == "ConditionalCheckFailedException"
+                and "Item" not in e.response
+            ):
+                raise KeyError(_log_keys(key_params)) from None
+            raise
+        finally:
+            self._invalidate_item(keys)
+        self._mark_written()
+
+    def get_items(
+        self,
+        keys: Iterable[DynamoDBKeySimplified],
+        force_consistent: bool = False,
+        prefetch: int = 1,
+        projection: Optional[Sequence[str]] = None,
+    ) -> Iterator[DynamoDBItemType]:
+        """Retrieves multiple items from the table with BatchGetItem operations.
+
+        The keys are sent in batches of 100, the maximum allowed by DynamoDB. The items are
+        returned in no particular order, and keys not found in the table are silently skipped.
+        If the item cache is enabled, the cached items are not requested again, and the retrieved
+        items are added to the cache, except for strongly consistent and projected reads.
+
+        Args:
+            keys (Iterable[DynamoDBKeySimplified]): The key values of the items.
+            force_consistent (bool): Use strongly consistent reads even if the mapping was not
+                written since the last read. Defaults to False.
+            prefetch (int): The number of batches that are retrieved in a background thread ahead
+                of the consumer, so that the network round-trips overlap with the processing of
+                the previous items. Set it to 0 to retrieve the batches on demand, in the calling
+                thread. Defaults to 1.
+            projection (Optional[Sequence[str]]): If set, only these attributes and the key
+                attributes of the items are retrieved. Defaults to None, that is all attributes.
+
+        Raises:
+            ValueError: If the required key values are not specified.
+
+        Returns:
+            Iterator[DynamoDBItemType]: An iterator over the retrieved items.
+        """
+        producer = functools.partial(
+            self._get_item_pages,
+            keys,
+            read_params=self._read_params(force_consistent, _projection_kwargs(self, projection)),
+            # The cache holds whole items only.
+            cache=None if force_consistent or projection is not None else self._item_cache,
+        )
+        if prefetch > 0:
+            pages = self._background_pages([producer], max_workers=1, maxsize=prefetch)
+        else:
+            pages = producer()
+        return itertools.chain.from_iterable(pages)
+
+    def _get_item_pages(
+        self,
+        keys: Iterable[DynamoDBKeySimplified],
+        read_params: Dict[str, Any],
+        cache: Optional[TTLCache],
+    ) -> Iterator[List[DynamoDBItemType]]:
+        deserialize_item = self._deserializer.deserialize_item
+        key_iter = iter(keys)
+        while True:
+            # BatchGetItem rejects duplicate keys in a request.
+            chunk = {
+                create_tuple_keys(k): self._create_key_param(k)
+                for k in itertools.islice(key_iter, _BATCH_GET_SIZE)
+            }
+            if not chunk:
+                return
+            if cache is not None:
+                cached = []
+                for tuple_keys in list(chunk):
+                    data = cache.get(tuple_keys)
+                    if data is not None:
+                        del chunk[tuple_keys]
+                        # Copied, so that modifying the returned item does not modify the cache.
+                        cached.append(_copy_item(data))
+                if cached:
+                    yield cached
+                if not chunk:
+                    continue
+            request_items = {self._table_name: {
+                "Keys": list(map(self._serialize_item, chunk.values())), **read_params
+            }}
+            attempt = 0
+            while request_items:
+                response = self._client.batch_get_item(RequestItems=request_items)
+                items = list(map(deserialize_item, response["Responses"].get(self._table_name, [])))
+                if cache is not None:
+                    for item in items:
+                        cache.set(self._key_values_from_item(item), _copy_item(item))
+                yield items
+                request_items = response.get("UnprocessedKeys")
+                if request_items:
+                    time.sleep(random.uniform(0, _backoff_delay(attempt)))
+                    attempt += 1
+
+    def set_items(self, items: Iterable[DynamoDBItemType], max_workers: int = 8) -> None:
+        """Creates or overwrites multiple items in the table with BatchWriteItem operations.
+
+        The items are written in batches of 25, the maximum allowed by DynamoDB, and up to
+        `max_workers` batches are written concurrently. Each item must contain its key attributes.
+        If the same key occurs more than once in a batch, the last item is written.
+
+        Args:
+            items (Iterable[DynamoDBItemType]): The items to write.
+            max_workers (int): The maximum number of concurrent BatchWriteItem requests, limited
+                to the `max_pool_connections` of the mapping. Defaults to 8.
+
+        Raises:
+            KeyError: If an item does not contain the key attributes.
+        """
+        self._check_no_transaction("set_items")
+        get_key = self._get_key
+        serialize_item = self._serialize_item
+        self._batch_write(
+            ((get_key(item), {"PutRequest": {"Item": serialize_item(item)}}) for item in items),
+            max_workers
+        )
+
+    def del_items(self, keys: Iterable[DynamoDBKeySimplified], max_workers: int = 8) -> None:
+        """Deletes multiple items from the table with BatchWriteItem operations.
+
+        The keys are deleted in batches of 25, the maximum allowed by DynamoDB, and up to
+        `max_workers` batches are deleted concurrently. Keys that are not in the table are ignored.
+
+        Args:
+            keys (Iterable[DynamoDBKeySimplified]): The keys of the items to delete.
+            max_workers (int): The maximum number of concurrent BatchWriteItem requests, limited
+                to the `max_pool_connections` of the mapping. Defaults to 8.
+
+        Raises:
+            ValueError: If the required key values are not specified.
+        """
+        self._check_no_transaction("del_items")
+        create_key_param = self._create_key_param
+        serialize_item = self._serialize_item
+        self._batch_write(
+            ((k, {"DeleteRequest": {"Key": serialize_item(create_key_param(k))}}) for k in keys),
+            max_workers
+        )
+
+    def _batch_write(
+        self, requests: Iterable[Tuple[DynamoDBKeySimplified, Dict[str, Any]]], max_workers: int
+    ) -> None:
+        """Sends the (key, serialized write request) pairs with concurrent BatchWriteItem calls."""
+        max_workers = min(max_workers, self._max_pool_connections)
+        request_iter = iter(requests)
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="dynamodb-write"
+        ) as executor:
+            pending: Set[Future] = set()
+            while True:
+                # BatchWriteItem rejects duplicate keys in a request.
+                chunk = {
+                    create_tuple_keys(keys): request
+                    for keys, request in itertools.islice(request_iter, _BATCH_WRITE_SIZE)
+                }
+                if chunk:
+                    pending.add(executor.submit(self._write_batch, chunk))
+                # Bound the number of chunks held in memory.
+                if len(pending) >= 2 * max_workers or (not chunk and pending):
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                if not chunk and not pending:
+                    break
+        self._mark_written()
+
+    def _write_batch(self, chunk: Dict[DynamoDBKeyAny, Dict[str, Any]]) -> None:
+        request_items = {self._table_name: list(chunk.values())}
+        attempt = 0
+        while request_items:
+            response = self._client.batch_write_item(RequestItems=request_items)
+            request_items = response.get("UnprocessedItems")
+            if request_items:
+                time.sleep(random.uniform(0, _backoff_delay(attempt)))
+                attempt += 1
+        if self._item_cache is not None:
+            for keys in chunk:
+                self._invalidate_item(keys)
+
+    def _key_values_from_item(self, item: DynamoDBItemType) -> DynamoDBKeyAny:
+        # Shadowed in __init__ by the specialized getter: kept for the callers of the class
+        # attribute, without a generator per call.
+        return tuple(map(item.__getitem__, self.key_names))
+
+    def _specialized_key_values_factory(self) -> Callable[[DynamoDBItemType], DynamoDBKeyAny]:
+        """Returns a `_key_values_from_item` specialized for the key schema of the table."""
+        if self._single_key:
+            (hash_key,) = self.key_names
+            return lambda item: (item[hash_key],)
+        # itemgetter of several names already returns the key tuple.
+        return self._get_key
+
+    def __iter__(self) -> Iterator[DynamoDBKeySimplified]:
+        """Returns an iterator over the keys of the table, scanning only the key attributes."""
+        pages = self.scan_pages(
+            total_segments=self.total_segments,
+            Select="SPECIFIC_ATTRIBUTES",
+            **self._key_projection,
+        )
+        # Flattens the key pages without a Python level generator frame per key.
+        return itertools.chain.from_iterable(map(functools.partial(map, self._get_key), pages))
+
+    def count_items(
+        self, total_segments: int = 1, force_consistent: bool = False, **kwargs
+    ) -> int:
+        """Counts the items in the table exactly.
+
+        The table is scanned with `Select="COUNT"`, so no items are transferred, but the scan
+        still consumes read capacity for the whole table. Use `len` for the approximate count
+        that DynamoDB updates every six hours.
+
+        Args:
+            total_segments (int): The number of segments to count in parallel. Defaults to 1.
+            force_consistent (bool): Use a strongly consistent scan even if the mapping was not
+                written since the last read. Defaults to False.
+            **kwargs: keyword arguments to be passed to the underlying DynamoDB scan operation,
+                for example a `FilterExpression` to count only the matching items.
+
+        Returns:
+            int: The number of items in the table, or the number of items matching the filter.
+        """
+        params = self._scan_params({
+            **self._read_params(force_consistent, kwargs),
+            "TableName": self._table_name,
+            "Select": "COUNT",
+        })
+        if total_segments == 1:
+            return self._count_segment(params)
+        with ThreadPoolExecutor(
+            max_workers=min(total_segments, self._max_pool_connections),
+            thread_name_prefix="dynamodb-read",
+        ) as executor:
+            return sum(executor.map(
+                lambda segment: self._count_segment(
+                    {**params, "Segment": segment, "TotalSegments": total_segments}
+                ),
+                range(total_segments),
+            ))
+
+    def _count_segment(self, params: Dict[str, Any]) -> int:
+        return sum(page["Count"] for page in self._scan_paginator.paginate(**params))
+
+    def __len__(self) -> int:
+        """Returns a best effort estimation of the number of items in the table.
+
+        DynamoDB updates this number approximately every six hours, so the value is cached and
+        the table description is reloaded at most once in `item_count_ttl` seconds.
+        Use `count_items` for the exact number of items, instead of `len(list(mapping.keys()))`.
+        """
+        if time.monotonic() - self._item_count_updated > self.item_count_ttl:
+            return self.refresh_item_count()
+        return self._item_count
+
+    def refresh_item_count(self) -> int:
+        """Reloads the approximate number of items in the table from DynamoDB.
+
+        Returns:
+            int: The approximate number of items in the table.
+        """
+        self._describe_table()
+        return self._item_count
+
+    def _describe_table(self) -> Dict[str, Any]:
+        """Describes the table with a single DescribeTable call, updating the cached properties.
+
+        The description is also shared with the mappings of the same table created later with
+        the same boto3 session.
+        """
+        description = self._client.describe_table(TableName=self._table_name)["Table"]
+        described = time.monotonic()
+        self._table_descriptions[self._table_name] = (described, description)
+        return self._apply_description(described, description)
+
+    def _apply_description(self, described: float, description: Dict[str, Any]) -> Dict[str, Any]:
+        throughput = description.get("ProvisionedThroughput", {})
+        self._provisioned_rcu = throughput.get("ReadCapacityUnits", 0)
+        self._item_count = description["ItemCount"]
+        self._item_count_updated = described
+        return description
+
+    def __contains__(self, keys: object) -> bool:
+        """Checks if an item is stored under the keys, retrieving only its key attributes."""
+        return self._has_item(keys)
+
+    def _has_item(self, keys: Any) -> bool:
+        try:
+            key_params = self._create_key_param(keys)
+        except ValueError:
+            return False
+        if self._item_cache is not None:
+            try:
+                if self._item_cache.get(create_tuple_keys(keys)) is not None:
+                    return True
+            except TypeError:
+                # Unhashable key values can not be in the cache.
+                pass
+        try:
+            # Only the key values need to be serialized, the projection is precomputed.
+            response = self._client.get_item(
+                TableName=self._table_name,
+                Key=self._serialize_item(key_params),
+                **self._hash_key_projection,
+                **self._read_params(False, {})
+            )
+        except ClientError as e:
+            # Key values of the wrong type
+            if e.response["Error"]["Code"] == "ValidationException":
+                return False
+            raise
+        return "Item" in response
+
+    def pop(self, key: DynamoDBKeySimplified, default: Any = _MISSING) -> Any:
+        """Deletes an item from the table and returns it.
+
+        The item is deleted and returned by a single DeleteItem operation.
+
+        Args:
+            key (DynamoDBKeySimplified): The key value of the item.
+            default (Any): The value returned if there is no item under the key. If not set, a
+                KeyError is raised in this case.
+
+        Raises:
+            KeyError: If no item can be found under this key in the table and no default is set.
+
+        Returns:
+            Any: The deleted item, or the default value.
+        """
+        self._check_no_transaction("pop")
+        key_params = self._create_key_param(key)
+        logger.debug("Performing a delete_item operation on %s table", self._table_name)
+        response = self._client.delete_item(
+            TableName=self._table_name,
+            Key=self._serialize_item(key_params),
+            ReturnValues="ALL_OLD",
+        )
+        self._invalidate_item(key)
+        self._mark_written()
+        if "Attributes" not in response:
+            if default is _MISSING:
+                raise KeyError(_log_keys(key_params))
+            return default
+        return self._deserializer.deserialize_item(response["Attributes"])
+
+    def popitem(self) -> Tuple[DynamoDBKeySimplified, DynamoDBItemType]:
+        """Deletes an arbitrary item from the table and returns its (key, item) pair.
+
+        The key is retrieved with a Scan of a single item, projected to the key attributes, and the
+        item is deleted and returned by a single DeleteItem operation.
+
+        Raises:
+            KeyError: If the table is empty.
+
+        Returns:
+            Tuple[DynamoDBKeySimplified, DynamoDBItemType]: The key and the deleted item.
+        """
+        self._check_no_transaction("popitem")
+        params = self._scan_params({
+            **self._read_params(False, {}),
+            **self._key_projection,
+            "TableName": self._table_name,
+            "Limit": 1,
+        })
+        while True:
+            items = self._client.scan(**params)["Items"]
+            if not items:
+                raise KeyError("popitem(): table is empty")
+            key = self._get_key(self._deserializer.deserialize_item(items[0]))
+            item = self.pop(key, None)
+            # Deleted by another client in the meantime: try the next item.
+            if item is not None:
+                return key, item
+
+    def update(self, other: Any = (), /, **kwds: DynamoDBItemType) -> None:
+        """Creates or overwrites the items of other, a mapping or an iterable of (key, item) pairs.
+
+        The items are written with `set_items`, that is with concurrent BatchWriteItem operations,
+        instead of one PutItem operation per item.
+        """
+        self._check_no_transaction("update")
+        if isinstance(other, Mapping):
+            pairs: Iterable[Tuple[Any, DynamoDBItemType]] = other.items()
+        elif hasattr(other, "keys"):
+            pairs = ((key, other[key]) for key in other.keys())
+        else:
+            pairs = other
+        self.set_items(
+            self._with_key_attributes(key, item)
+            for key, item in itertools.chain(pairs, kwds.items())
+        )
+
+    def _with_key_attributes(
+        self, keys: DynamoDBKeySimplified, item: DynamoDBItemType
+    ) -> DynamoDBItemType:
+        """Returns the item with its key attributes, copying it only if they are missing."""
+        key_params = self._create_key_param(keys)
+        # Items read from the table already contain their key attributes: no need to copy them.
+        if key_params.items() <= item.items():
+            return item
+        return {**item, **key_params}
+
+    def clear(self) -> None:
+        """Deletes all items from the table.
+
+        The keys are scanned and deleted with concurrent BatchWriteItem operations, instead of
+        scanning the table again for each deleted item.
+        """
+        self._check_no_transaction("clear")
+        self.del_items(iter(self))
+
+    def keys(self) -> KeysView:
+        """Returns a view over the keys in the table."""
+        return DynamoDBTableKeysView(self)
+
+    def items(
+        self, projection: Optional[Sequence[str]] = None, total_segments: Optional[int] = None
+    ) -> ItemsView:
+        """Returns a view over the (key, item) tuples in the table.
+
+        Args:
+            projection (Optional[Sequence[str]]): If set, only these attributes and the key
+                attributes of the items are retrieved. Defaults to None, that is all attributes.
+            total_segments (Optional[int]): The number of segments scanned in parallel when
+                iterating over the view. Defaults to None, that is the `total_segments` of the
+                mapping.
+        """
+        return DynamoDBTableItemsView(self, projection, total_segments)
+
+    def values(
+        self, projection: Optional[Sequence[str]] = None, total_segments: Optional[int] = None
+    ) -> ValuesView:
+        """Returns a view over the items in the table.
+
+        Membership tests on the view (`item in mapping.values()`) do not scan the table: the
+        stored item is retrieved by the key attributes of the tested item with a single GetItem
+        (served from the item cache if it is enabled), and items without key attributes are not
+        contained in the table.
+
+        Args:
+            projection (Optional[Sequence[str]]): If set, only these attributes and the key
+                attributes of the items are retrieved. Defaults to None, that is all attributes.
+            total_segments (Optional[int]): The number of segments scanned in parallel when
+                iterating over the view. Defaults to None, that is the `total_segments` of the
+                mapping.
+        """
+        return DynamoDBTableValuesView(self, projection, total_segments)
+
+    def _serialize_params(self, operation_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts the parameters of a resource-level call to the format of the low-level client.
+
+        Condition objects are transformed to expressions and Python values to DynamoDB
+        AttributeValues, exactly as the resource interface would do.
+        """
+        model = self._client.meta.service_model.operation_model(operation_name)
+        params = copy_dynamodb_params(params)
+        injector = TransformationInjector()
+        injector.inject_condition_expressions(params, model)
+        injector.inject_attribute_value_input(params, model)
+        return params
+
+    def _scan_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts the parameters of a scan to the format of the low-level client.
+
+        Scans of the whole table or of a projection, like the key-only scan of `__iter__`, have
+        nothing to serialize: the generic transformation is applied only to filtered scans.
+        """
+        if params.keys() <= _PLAIN_SCAN_PARAMS:
+            return params
+        return self._serialize_params("Scan", params)
+
+    def scan(self, **kwargs) -> Iterator[DynamoDBItemType]:
+        """Performs a scan operation on the DynamoDB table.
+
+        The scan is executed in a lazy manner, in that the successive pages are queried only on
+        demand. If `total_segments` is greater than one, the table is split into that many segments
+        that are scanned concurrently, and the items are yielded as the pages of the segments
+        arrive. The order of the items is not defined in this case.
+
+        Args:
+            **kwargs: The scan options documented at `scan_pages`, and keyword arguments to be
+                passed to the underlying DynamoDB scan operation.
+
+        Returns:
+            Iterator[DynamoDBItemType]: An iterator over all items in the table.
+        """
+        # A generator rather than itertools.chain: close() stops the background scan workers
+        # right away. yield from a whole page already iterates over its items in C.
+        for page in self.scan_pages(**kwargs):
+            yield from page
+            # Release the consumed page before the next one is requested.
+            del page
+
+    async def ascan(self, **kwargs) -> AsyncIterator[DynamoDBItemType]:
+        """Performs a scan operation on the DynamoDB table from asyncio code.
+
+        Like `scan`, but the pages are awaited in the default executor of the event loop, so that
+        the loop is not blocked while the pages are retrieved. With the default `prefetch` of
+        `scan_pages`, the next page is already being retrieved while the items of the current page
+        are processed.
+
+        Args:
+            **kwargs: The scan options documented at `scan_pages`, and keyword arguments to be
+                passed to the underlying DynamoDB scan operation.
+
+        Returns:
+            AsyncIterator[DynamoDBItemType]: An asynchronous iterator over all items in the table.
+        """
+        loop = asyncio.get_running_loop()
+        pages = self.scan_pages(**kwargs)
+        # If the consumer is cancelled while an executor thread retrieves the next page, the
+        # generator can be closed only after that thread returned.
+        lock = threading.Lock()
+
+        def next_page() -> Optional[List[DynamoDBItemType]]:
+            with lock:
+                return next(pages, None)
+
+        def close() -> None:
+            with lock:
+                pages.close()
+
+        try:
+            while True:
+                page = await loop.run_in_executor(None, next_page)
+                if page is None:
+                    return
+                for item in page:
+                    yield item
+                del page
+        finally:
+            # Stops the background workers of the scan.
+            await loop.run_in_executor(None, close)
+
+    def scan_pages(
+        self,
+        total_segments: int = 1,
+        max_workers: Optional[int] = None,
+        force_consistent: bool = False,
+        read_capacity_fraction: Optional[float] = None,
+        prefetch: int = 1,
+        **kwargs
+    ) -> Iterator[List[DynamoDBItemType]]:
+        """Performs a scan operation on the DynamoDB table, returning the items page by page.
+
+        Each page holds at most 1 MB of data, or `Limit` items if this scan parameter is set.
+
+        Args:
+            total_segments (int): The number of segments to scan in parallel. Defaults to 1, that
+                is a serial scan.
+            max_workers (Optional[int]): The maximum number of worker threads of a parallel scan.
+                Defaults to `total_segments`. At most `max_pool_connections` of the mapping
+                workers are used, the remaining segments are scanned when a worker is free.
+            force_consistent (bool): Use a strongly consistent scan even if the mapping was not
+                written since the last read. Defaults to False.
+            read_capacity_fraction (Optional[float]): If set, the scan is slowed down so that it
+                consumes at most this fraction of the provisioned read capacity of the table,
+                instead of being throttled by DynamoDB. Ignored for on-demand tables.
+            prefetch (int): The number of pages of each segment that are fetched in a background
+                thread ahead of the consumer, so that the network round-trips overlap with the
+                processing of the previous pages. Set it to 0 to fetch the pages of a serial scan
+                on demand, in the calling thread. Defaults to 1.
+            **kwargs: keyword arguments to be passed to the underlying DynamoDB scan operation.
+
+        Returns:
+            Iterator[List[DynamoDBItemType]]: An iterator over the pages of the scan.
+        """
+        kwargs = self._read_params(force_consistent, kwargs)
+        read_rate = None
+        if read_capacity_fraction is not None and self._provisioned_rcu > 0:
+            # Capacity units per second available for each segment.
+            read_rate = self._provisioned_rcu * read_capacity_fraction / total_segments
+        if total_segments > 1:
+            return self._parallel_scan_pages(
+                total_segments,
+                max_workers=max_workers, read_rate=read_rate, prefetch=prefetch, **kwargs
+            )
+        logger.debug("Performing a scan operation on %s table", self._table_name)
+        if prefetch > 0:
+            producer = functools.partial(self._scan_pages, read_rate=read_rate, **kwargs)
+            return self._background_pages([producer], max_workers=1, maxsize=prefetch)
+        return self._scan_pages(read_rate=read_rate, **kwargs)
+
+    def _scan_pages(
+        self, read_rate: Optional[float] = None, **kwargs
+    ) -> Iterator[List[DynamoDBItemType]]:
+        # The low-level client is thread safe, so this is also used by the parallel scan workers.
+        params = self._scan_params({**kwargs, "TableName": self._table_name})
+        if read_rate is not None:
+            params["ReturnConsumedCapacity"] = "TOTAL"
+        deserialize_item = self._deserializer.deserialize_item
+        paginate = self._scan_paginator.paginate
+        started = time.monotonic()
+        for page in paginate(**params):
+            # The raw items are released as soon as they are deserialized, and the deserialized
+            # page is yielded from a holder, so that this frame does not keep it alive while the
+            # next page is requested.
+            holder = [list(map(deserialize_item, page.pop("Items")))]
+            yield holder.pop()
+            if read_rate is not None:
+                # Wait until the capacity consumed by this page is replenished.
+                consumed = page["ConsumedCapacity"]["CapacityUnits"]
+                delay = started + consumed / read_rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                started = time.monotonic()
+
+    def _parallel_scan_pages(
+        self,
+        total_segments: int,
+        max_workers: Optional[int] = None,
+        read_rate: Optional[float] = None,
+        prefetch: int = 1,
+        **kwargs
+    ) -> Iterator[List[DynamoDBItemType]]:
+        logger.debug(
+            "Performing a parallel scan operation on %s table with %d segments",
+            self._table_name, total_segments
+        )
+        producers = [
+            functools.partial(
+                self._scan_pages,
+                read_rate=read_rate, Segment=segment, TotalSegments=total_segments, **kwargs
+            )
+            for segment in range(total_segments)
+        ]
+        return self._background_pages(
+            producers, max_workers=max_workers, maxsize=(prefetch + 1) * total_segments
+        )
+
+    def _background_pages(
+        self,
+        producers: List[Callable[[], Iterator[List[DynamoDBItemType]]]],
+        max_workers: Optional[int],
+        maxsize: int,
+    ) -> Iterator[List[DynamoDBItemType]]:
+        """Runs the page producers in worker threads and yields the pages as they arrive.
+
+        Used by the scans and by `get_items`.
+        """
+        # Bounded queue: workers block when the consumer falls behind.
+        pages: queue.Queue = queue.Queue(maxsize=maxsize)
+        stop = threading.Event()
+
+        def put(obj: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(obj, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker(producer: Callable[[], Iterator[List[DynamoDBItemType]]]) -> None:
+            try:
+                for page in producer():
+                    if not put(page):
+                        return
+            except BaseException as e:
+                # Re-raised by the consumer, so nothing is swallowed in the worker thread.
+                put(e)
+            finally:
+                put(_SEGMENT_DONE)
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(max_workers or len(producers), self._max_pool_connections),
+            thread_name_prefix="dynamodb-read",
+        )
+        try:
+            for producer in producers:
+                executor.submit(worker, producer)
+            remaining = len(producers)
+            while remaining:
+                obj = pages.get()
+                if obj is _SEGMENT_DONE:
+                    remaining -= 1
+                elif isinstance(obj, BaseException):
+                    raise obj
+                else:
+                    yield obj
+        finally:
+            stop.set()
+            executor.shutdown(wait=False)
@@ -1,13 +1,25 @@
 from typing import (
-    Literal, Dict, Union, Mapping, Sequence, TypeVar, MutableMapping, List, cast
+    Any, Literal, Dict, Union, Mapping, Sequence, TypeVar, MutableMapping, List,
+    TYPE_CHECKING, cast
 )
+from decimal import Decimal
+import functools
+import hashlib
 import json
 import logging
 
-import pandas as pd
 import streamlit as st
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 from .connection import DynamoDBConnection, DynamoDBItemType
+from .utils import is_pandas_object
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 logger = logging.getLogger(__name__)
@@ -16,33 +28,60 @@ logger = logging.getLogger(__name__)
 class JSONError(RuntimeError): ...
 
 
-DFOrMapping = TypeVar("DFOrMapping", pd.DataFrame, MutableMapping)
+DFOrMapping = TypeVar("DFOrMapping", "pd.DataFrame", MutableMapping)
 
 
-def _get_json_serializable_cols(df) -> List[str]:
+def _get_json_serializable_cols(df: "pd.DataFrame") -> List[str]:
+    if df.empty:
+        return []
     res = []
-    _, row = next(df.iterrows())
-    for label, value in row.items():
+    # Only the columns of object dtype can hold dicts or lists: probe their first cell only,
+    # without materializing a whole row.
+    for label in df.columns[df.dtypes == object]:
+        value = df[label].iat[0]
         if isinstance(value, (Mapping, Sequence)) and not isinstance(value, (str, bytes, bytearray)):
             res.append(label)
     return res
 
 
-def _serialize_json_cols(df: pd.DataFrame, json_cols: Sequence[str]) -> pd.DataFrame:
+def _json_default(value: Any) -> Any:
+    """Serializes the numbers of the DynamoDB items, that are deserialized as Decimals."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _row_digest(row: Mapping[str, Any]) -> bytes:
+    """Returns a fixed size digest of the canonical JSON form of a row."""
+    if orjson is not None:
+        encoded = orjson.dumps(row, default=_json_default, option=orjson.OPT_SORT_KEYS)
+    else:
+        encoded = json.dumps(row, default=_json_default, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+
+def _serialize_json_cols(df: "pd.DataFrame", json_cols: Sequence[str]) -> "pd.DataFrame":
     for json_col in json_cols:
-        df[json_col] = df[json_col].apply(lambda o: json.dumps(o))
+        if orjson is not None:
+            # orjson returns bytes: decode the whole column at once.
+            dumps = functools.partial(orjson.dumps, default=_json_default)
+            df[json_col] = df[json_col].map(dumps).str.decode("utf-8")
+        else:
+            df[json_col] = df[json_col].map(functools.partial(json.dumps, default=_json_default))
     return df
 
 
 def _deserialize_json_cols(data: DFOrMapping, json_cols: Sequence[str]) -> DFOrMapping:
+    loads = orjson.loads if orjson is not None else json.loads
     for json_col in json_cols:
         try:
-            deserializer = lambda s: json.loads(s) if s is not None else None
-            if isinstance(data, pd.DataFrame):
-                data[json_col] = data[json_col].apply(deserializer)
+            if is_pandas_object(data, "DataFrame"):
+                # The missing cells are skipped by pandas, without a Python level check per cell.
+                data[json_col] = data[json_col].map(loads, na_action="ignore")
             elif isinstance(data, MutableMapping):
-                if json_col in data:
-                    data[json_col] = deserializer(data[json_col])
+                if data.get(json_col) is not None:
+                    data[json_col] = loads(data[json_col])
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError.
         except json.JSONDecodeError as e:
             raise JSONError(f"Invalid json string in column '{json_col}'!") from e
     return data
@@ -53,6 +92,7 @@ class DynamoDBTableEditor:
     _DATA_EDITOR_WIDGET_KEY: Literal["data_editor_widget"] = "data_editor_widget"
     _DATA_EDITOR_DATA_KEY: Literal["data_editor_data"] = "data_editor_data"
     _DATA_EDITOR_PROCESSED_KEY: Literal["data_editor_processed"] = "data_editor_processed"
+    _DATA_EDITOR_JSON_COLS_KEY: Literal["data_editor_json_cols"] = "data_editor_json_cols"
     _DEFAULT_EDIT_INFO: Dict[str, Union[Mapping, Sequence]] = {
         "edited_rows": {},
         "added_rows": [],
@@ -65,13 +105,30 @@ class DynamoDBTableEditor:
         self.data_key = self.key_prefix + self._DATA_EDITOR_DATA_KEY
         self.widget_key = self.key_prefix + self._DATA_EDITOR_WIDGET_KEY
         self.processed_edits_key = self.key_prefix + self._DATA_EDITOR_PROCESSED_KEY
+        self.json_cols_key = self.key_prefix + self._DATA_EDITOR_JSON_COLS_KEY
         if not self.data_key in st.session_state:
-            st.session_state[self.data_key] = self.connection.items(ignore_cache=True)
+            st.session_state[self.data_key] = self._load_items()
         self.df = st.session_state[self.data_key]
 
-    def edit(self) -> pd.DataFrame:
-        json_cols = _get_json_serializable_cols(self.df)
-        df = _serialize_json_cols(self.df.copy(), json_cols)
+    def _load_items(self) -> "pd.DataFrame":
+        connection = self.connection
+
+        @st.cache_data(show_spinner="Running `dynamodb.scan(...)`.", ttl=300)
+        def _load_items(
+            connection_name: str, table_name: str, write_count: int
+        ) -> "pd.DataFrame":
+            # The connection itself is not hashed. The mapping of the connection is shared by all
+            # sessions, so a write made by any of them changes the key and reloads the table.
+            return connection.items(ignore_cache=True)
+
+        mapping = connection.mapping
+        return _load_items(connection._connection_name, mapping.table_name, mapping.write_count)
+
+    def edit(self) -> "pd.DataFrame":
+        json_cols = self.json_cols
+        # A shallow copy: the serialized JSON columns replace their arrays in the copy only, and
+        # the other columns are shared with self.df.
+        df = _serialize_json_cols(self.df.copy(deep=False), json_cols)
         edited_df = st.data_editor(
             df,
             num_rows="dynamic",
@@ -88,6 +145,17 @@ class DynamoDBTableEditor:
         self.process_edits(json_cols)
         return edited_df
 
+    @property
+    def json_cols(self) -> List[str]:
+        # The columns are inspected again only if the schema of the dataframe changed.
+        signature = (tuple(self.df.columns), tuple(map(str, self.df.dtypes)))
+        cached = st.session_state.get(self.json_cols_key)
+        if cached is None or cached[0] != signature:
+            cached = st.session_state[self.json_cols_key] = (
+                signature, _get_json_serializable_cols(self.df)
+            )
+        return cached[1]
+
     @property
     def edit_info(self) -> Dict:
         return st.session_state.get(
@@ -98,7 +166,12 @@ class DynamoDBTableEditor:
     @property
     def processed_edits(self) -> Dict:
         if not self.processed_edits_key in st.session_state:
-            st.session_state[self.processed_edits_key] = self._DEFAULT_EDIT_INFO.copy()
+            # The digests of the added rows and the keys of the deleted rows are kept in sets.
+            st.session_state[self.processed_edits_key] = {
+                "edited_rows": {},
+                "added_rows": set(),
+                "deleted_rows": set(),
+            }
         return st.session_state[self.processed_edits_key]
 
     @processed_edits.setter
@@ -107,12 +180,17 @@ class DynamoDBTableEditor:
 
     def process_edits(self, json_cols: List[str]) :
         edit_info = self.edit_info
+        if not (edit_info["edited_rows"] or edit_info["added_rows"] or edit_info["deleted_rows"]):
+            # Rerun by another widget, nothing was edited.
+            return
         logger.debug("Edit info: %s", edit_info)
+        # Indexed by position once per edit, without the pandas level indexing of the Index.
+        index_values = self.df.index.to_numpy()
 
         # edited_rows
         processed_edited_rows = self.processed_edits["edited_rows"]
         for idx, edited_row in edit_info["edited_rows"].items():
-            index_val = self.df.index[int(idx)]
+            index_val = index_values[int(idx)]
             edited_row = _deserialize_json_cols(edited_row, json_cols)
             if idx in processed_edited_rows and processed_edited_rows[idx] == edited_row:
                 logger.debug(
@@ -128,21 +206,21 @@ class DynamoDBTableEditor:
         for added_row in edit_info["added_rows"]:
             added_row = _deserialize_json_cols(added_row, json_cols)
             keys = added_row.pop("_index")
-            added_row_repr = json.dumps(added_row, sort_keys=True)
-            if added_row_repr in processed_added_rows:
+            added_row_digest = _row_digest(added_row)
+            if added_row_digest in processed_added_rows:
                 logger.debug("New row '%s' was already added and up to date, continue...", keys)
                 continue
             self.connection.put_item(keys, item=added_row)
-            processed_added_rows.append(added_row_repr)
+            processed_added_rows.add(added_row_digest)
             logger.debug("Created or updated new row '%s': %s", keys, added_row)
 
         # deleted rows
         processed_deleted_rows = self.processed_edits["deleted_rows"]
         for idx in edit_info["deleted_rows"]:
-            index_val = self.df.index[int(idx)]
+            index_val = index_values[int(idx)]
             if index_val in processed_deleted_rows:
                 logger.debug("Row '%s' was already deleted, continue...", index_val)
                 continue
             self.connection.del_item(keys=index_val)
-            processed_deleted_rows.append(index_val)
+            processed_deleted_rows.add(index_val)
             logger.debug("Deleted row '%s'.", index_val)
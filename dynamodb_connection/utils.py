@@ -1,21 +1,233 @@
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Hashable, Iterable, Optional, Tuple
+from collections import OrderedDict
+from decimal import Decimal
+import sys
+import threading
+import time
+import weakref
 
 import boto3
+from boto3.dynamodb.types import DYNAMODB_CONTEXT, TypeDeserializer
+from botocore.config import Config
+
+_DEFAULT_SESSION: Optional[boto3.Session] = None
+_SESSION_LOCK = threading.Lock()
+_DYNAMODB_RESOURCES: "weakref.WeakKeyDictionary[boto3.Session, Any]" = weakref.WeakKeyDictionary()
+_DYNAMODB_CLIENTS: "weakref.WeakKeyDictionary[boto3.Session, Dict[int, Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+_CONFIG_SESSIONS: "OrderedDict[Tuple[Optional[str], ...], boto3.Session]" = OrderedDict()
+_CONFIG_SESSIONS_SIZE = 8
+_TABLE_DESCRIPTIONS: (
+    "weakref.WeakKeyDictionary[boto3.Session, Dict[str, Tuple[float, Dict[str, Any]]]]"
+) = weakref.WeakKeyDictionary()
 
 def get_case_insensitive(key: str, config: Dict[str, Any]) -> Optional[Any]:
     return config.get(key) or config.get(key.upper())
 
 def boto3_session_from_config(config: Dict[str, Any]) -> Optional[boto3.Session]:
+    """Returns the boto3 session of the credentials in config, or None if there are none.
+
+    The sessions are reused for the same configuration, so that the clients and the table
+    descriptions cached for a session survive the reconnections of a Streamlit app. They are
+    keyed by the access key id, the region and the profile, not by the secret key: a session is
+    replaced if its secret key changed, and only the most recently used sessions are kept.
+    """
     aws_access_key_id = get_case_insensitive("aws_access_key_id", config)
     aws_secret_access_key = get_case_insensitive("aws_secret_access_key", config)
     aws_region = get_case_insensitive("aws_region", config)
     aws_profile = get_case_insensitive("aws_profile", config)
     if aws_access_key_id is not None and aws_secret_access_key is not None:
-        return boto3.Session(
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-            region_name=aws_region,
-            profile_name=aws_profile,
-        )
+        session_key = (aws_access_key_id, aws_region, aws_profile)
+        with _SESSION_LOCK:
+            session = _CONFIG_SESSIONS.get(session_key)
+            if session is None or session.get_credentials().secret_key != aws_secret_access_key:
+                session = _CONFIG_SESSIONS[session_key] = boto3.Session(
+                    aws_access_key_id=aws_access_key_id,
+                    aws_secret_access_key=aws_secret_access_key,
+                    region_name=aws_region,
+                    profile_name=aws_profile,
+                )
+            _CONFIG_SESSIONS.move_to_end(session_key)
+            while len(_CONFIG_SESSIONS) > _CONFIG_SESSIONS_SIZE:
+                _CONFIG_SESSIONS.popitem(last=False)
+            return session
     else:
         return None
+
+def projection_params(attribute_names: Iterable[str], prefix: str = "#p") -> Dict[str, Any]:
+    """Creates the ProjectionExpression and ExpressionAttributeNames parameters of a read operation.
+
+    Placeholders are used for all attribute names, so that reserved words can be projected too.
+    """
+    names = {f"{prefix}{idx}": name for idx, name in enumerate(attribute_names)}
+    return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+_SCALAR_KEY_TYPES = (str, int, Decimal, bytes, bytearray)
+"""The types of the DynamoDB key values that are wrapped in a tuple by `create_tuple_keys`."""
+
+_SCALAR_KEY_TYPE_SET = frozenset(_SCALAR_KEY_TYPES)
+"""The frozenset of `_SCALAR_KEY_TYPES`, for the exact type lookup of `create_tuple_keys`."""
+
+def create_tuple_keys(key: Any) -> Tuple[Any, ...]:
+    """Creates a well-defined DynamoDB key from a simplified key.
+
+    Equivalent to `dynamodb_mapping.create_tuple_keys`, but checks the concrete types first instead
+    of the slow `isinstance(key, collections.abc.Iterable)` ABC check.
+    """
+    key_type = type(key)
+    if key_type is tuple:
+        return key
+    if key_type in _SCALAR_KEY_TYPE_SET:
+        return (key,)
+    # Subclasses of the scalar types, lists and other iterables are rare: use the generic checks.
+    if isinstance(key, _SCALAR_KEY_TYPES):
+        return (key,)
+    try:
+        return tuple(key)
+    except TypeError:
+        return (key,)
+
+def is_pandas_object(obj: Any, class_name: str) -> bool:
+    """Checks if obj is an instance of a pandas class without importing pandas.
+
+    If pandas was not imported yet, obj can not be a pandas object.
+    """
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(obj, getattr(pandas, class_name))
+
+def get_default_session() -> boto3.Session:
+    """Returns a process-wide default boto3 session, creating it on the first call."""
+    global _DEFAULT_SESSION
+    with _SESSION_LOCK:
+        if _DEFAULT_SESSION is None:
+            _DEFAULT_SESSION = boto3.Session()
+        return _DEFAULT_SESSION
+
+def _dynamodb_config(max_pool_connections: int) -> Config:
+    """The botocore configuration of the DynamoDB clients and resources created by this package."""
+    return Config(
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=True,
+        retries={"mode": "adaptive", "max_attempts": 3},
+    )
+
+def get_dynamodb_resource(session: boto3.Session) -> Any:
+    """Returns the DynamoDB service resource of the session, creating it on the first call.
+
+    The resource is configured like the clients of `get_dynamodb_client`, with the default
+    connection pool size.
+    """
+    with _SESSION_LOCK:
+        resource = _DYNAMODB_RESOURCES.get(session)
+        if resource is None:
+            resource = _DYNAMODB_RESOURCES[session] = session.resource(
+                "dynamodb", config=_dynamodb_config(10)
+            )
+        return resource
+
+def get_dynamodb_client(session: boto3.Session, max_pool_connections: int = 10) -> Any:
+    """Returns a low-level DynamoDB client of the session, creating it on the first call.
+
+    The client keeps at most `max_pool_connections` connections open, so that many threads can
+    send requests concurrently. TCP keep-alive is enabled, and throttled requests are retried in
+    the adaptive retry mode, that also slows down the client when the table is throttled.
+    """
+    with _SESSION_LOCK:
+        clients = _DYNAMODB_CLIENTS.setdefault(session, {})
+        client = clients.get(max_pool_connections)
+        if client is None:
+            client = clients[max_pool_connections] = session.client(
+                "dynamodb", config=_dynamodb_config(max_pool_connections)
+            )
+        return client
+
+def get_table_descriptions(session: boto3.Session) -> Dict[str, Tuple[float, Dict[str, Any]]]:
+    """Returns the (time.monotonic() timestamp, DescribeTable result) pairs of the session.
+
+    The dictionary is keyed by the table name and shared by all mappings of the session, so that
+    only the first mapping of a table sends a DescribeTable request.
+    """
+    with _SESSION_LOCK:
+        return _TABLE_DESCRIPTIONS.setdefault(session, {})
+
+class TTLCache:
+    """A thread safe, size bounded LRU cache whose entries expire after a fixed time.
+
+    Args:
+        maxsize (int): The maximum number of entries in the cache.
+        ttl (float): The number of seconds after an entry expires.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+def _identity(value: Any) -> Any:
+    return value
+
+def _none(_value: Any) -> None:
+    return None
+
+class DynamoDBDeserializer(TypeDeserializer):
+    """A TypeDeserializer that dispatches on a precomputed table of the DynamoDB types.
+
+    The base class builds the name of the deserializer method and looks it up with `getattr` for
+    each value, which dominates the per-item cost of large scans. The results are identical.
+    """
+
+    def __init__(self) -> None:
+        self._dispatch: Dict[str, Callable[[Any], Any]] = {
+            "S": _identity,
+            "N": DYNAMODB_CONTEXT.create_decimal,
+            "BOOL": _identity,
+            "NULL": _none,
+            "M": self._deserialize_m,
+            "L": self._deserialize_l,
+            "B": self._deserialize_b,
+            "SS": set,
+            "NS": self._deserialize_ns,
+            "BS": self._deserialize_bs,
+        }
+
+    def deserialize(self, value: Dict[str, Any]) -> Any:
+        if len(value) == 1:
+            for dynamodb_type, raw in value.items():
+                deserializer = self._dispatch.get(dynamodb_type)
+                if deserializer is not None:
+                    return deserializer(raw)
+        return super().deserialize(value)
+
+    def deserialize_item(self, item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Deserializes all attributes of a DynamoDB item in the low-level format."""
+        deserialize = self.deserialize
+        return {name: deserialize(value) for name, value in item.items()}
@@ -0,0 +1,126 @@
+import os
+from typing import Any, Callable, Dict, List
+
+import boto3
+import pytest
+import streamlit as st
+from moto import mock_aws
+
+from dynamodb_connection import DynamoDBConnection, DynamoDBTableMapping
+
+
+@pytest.fixture
+def session(monkeypatch: pytest.MonkeyPatch) -> Any:
+    """A boto3 session of mocked AWS services, with fake credentials."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    with mock_aws():
+        # A new session for each test: the clients and the table descriptions are per session.
+        yield boto3.Session(region_name=os.environ["AWS_DEFAULT_REGION"])
+
+
+@pytest.fixture
+def create_table(session: Any) -> Callable[..., str]:
+    """Creates a table with a "pk" hash key, and a numeric "sk" range key if composite is set.
+
+    The table holds item_count items with a numeric "value" attribute, the items of a composite
+    table are spread over three sort keys.
+    """
+
+    def create_table(
+        item_count: int = 0,
+        table_name: str = "test_table",
+        composite: bool = False,
+        **kwargs: Any
+    ) -> str:
+        key_schema = [{"AttributeName": "pk", "KeyType": "HASH"}]
+        attributes = [{"AttributeName": "pk", "AttributeType": "S"}]
+        if composite:
+            key_schema.append({"AttributeName": "sk", "KeyType": "RANGE"})
+            attributes.append({"AttributeName": "sk", "AttributeType": "N"})
+        client = session.client("dynamodb")
+        client.create_table(
+            TableName=table_name,
+            KeySchema=key_schema,
+            AttributeDefinitions=attributes,
+            **(kwargs or {"BillingMode": "PAY_PER_REQUEST"}),
+        )
+        for i in range(item_count):
+            item: Dict[str, Any] = {"pk": {"S": f"key{i}"}, "value": {"N": str(i)}}
+            if composite:
+                item["sk"] = {"N": str(i % 3)}
+            client.put_item(TableName=table_name, Item=item)
+        return table_name
+
+    return create_table
+
+
+@pytest.fixture
+def make_mapping(session: Any, create_table: Callable[..., str]) -> Callable[..., Any]:
+    """Creates a table like create_table, and returns its mapping."""
+
+    def make_mapping(
+        item_count: int = 0, composite: bool = False, **kwargs: Any
+    ) -> DynamoDBTableMapping:
+        table_name = create_table(item_count, composite=composite)
+        return DynamoDBTableMapping(table_name, boto3_session=session, **kwargs)
+
+    return make_mapping
+
+
+@pytest.fixture
+def record_calls(monkeypatch: pytest.MonkeyPatch) -> Callable[[Any, str], List[Dict[str, Any]]]:
+    """Records the keyword arguments of the calls of a client method, that is still called."""
+
+    def record_calls(client: Any, method_name: str) -> List[Dict[str, Any]]:
+        method = getattr(client, method_name)
+        calls: List[Dict[str, Any]] = []
+
+        def recording_method(**kwargs: Any) -> Any:
+            calls.append(kwargs)
+            return method(**kwargs)
+
+        monkeypatch.setattr(client, method_name, recording_method)
+        return calls
+
+    return record_calls
+
+
+@pytest.fixture
+def make_connection(session: Any, create_table: Callable[..., str]) -> Any:
+    """Creates a table like create_table, and returns a connection to it.
+
+    The Streamlit caches are cleared, as the cached functions of the connection are not keyed
+    by the table.
+    """
+    def make_connection(
+        item_count: int = 0, composite: bool = False, **kwargs: Any
+    ) -> DynamoDBConnection:
+        table_name = create_table(item_count, composite=composite)
+        return DynamoDBConnection(
+            "test_connection", table_name=table_name, boto3_session=session, **kwargs
+        )
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    yield make_connection
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+@pytest.fixture
+def record_requests() -> Callable[[Any, str], List[Dict[str, Any]]]:
+    """Records the parameters of the requests of an operation, including the paginated ones."""
+
+    def record_requests(client: Any, operation_name: str) -> List[Dict[str, Any]]:
+        requests: List[Dict[str, Any]] = []
+
+        def record(params: Dict[str, Any], **kwargs: Any) -> None:
+            requests.append(dict(params))
+
+        client.meta.events.register(f"before-parameter-build.dynamodb.{operation_name}", record)
+        return requests
+
+    return record_requests
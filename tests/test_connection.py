@@ -0,0 +1,276 @@
+import subprocess
+import sys
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from boto3.dynamodb.conditions import Attr
+
+from dynamodb_connection import DynamoDBConnection
+
+MakeConnection = Callable[..., DynamoDBConnection]
+
+SPARSE_ITEMS = [
+    {"pk": "a", "value": 1, "text": "first"},
+    {"pk": "b", "value": 2},
+    {"pk": "c", "text": "third", "tags": ["x", "y"]},
+]
+
+
+class TestDataFrame:
+
+    def test_equals_the_dataframe_of_the_items(self, make_connection: MakeConnection) -> None:
+        conn = make_connection()
+        conn.mapping.set_items(SPARSE_ITEMS)
+        df = conn.items(ignore_cache=True).sort_index()
+        expected = pd.DataFrame(list(conn.mapping.scan())).set_index("pk").sort_index()
+        pd.testing.assert_frame_equal(df, expected[df.columns])
+        assert sorted(df.columns) == ["tags", "text", "value"]
+
+    def test_fills_the_missing_attributes_with_nan(self, make_connection: MakeConnection) -> None:
+        conn = make_connection()
+        conn.mapping.set_items(SPARSE_ITEMS)
+        df = conn.items(ignore_cache=True)
+        assert df["text"].isna().to_dict() == {"a": False, "b": True, "c": False}
+        assert df["tags"].isna().sum() == 2
+        assert df.loc["a", "value"] == Decimal(1)
+
+    def test_empty_table(self, make_connection: MakeConnection) -> None:
+        df = make_connection().items(ignore_cache=True)
+        assert df.empty
+        assert df.index.name == "pk"
+
+    def test_composite_keys_are_a_multi_index(self, make_connection: MakeConnection) -> None:
+        conn = make_connection(item_count=6, composite=True)
+        df = conn.items(ignore_cache=True)
+        assert isinstance(df.index, pd.MultiIndex)
+        assert list(df.index.names) == ["pk", "sk"]
+        assert list(df.columns) == ["value"]
+        assert df.loc[("key4", 1), "value"] == 4
+        expected = pd.DataFrame(list(conn.mapping.scan())).set_index(["pk", "sk"])
+        pd.testing.assert_frame_equal(df.sort_index(), expected.sort_index())
+
+    def test_get_items_dataframe(self, make_connection: MakeConnection) -> None:
+        conn = make_connection(item_count=6, composite=True)
+        df = conn.get_items([("key1", 1), ("key2", 2), ("key3", 3)])
+        assert list(df.index.names) == ["pk", "sk"]
+        assert sorted(df.index) == [("key1", 1), ("key2", 2)]
+
+
+class TestChunkedItems:
+
+    def test_returns_dataframes_of_at_most_chunk_size_items(
+        self, make_connection: MakeConnection
+    ) -> None:
+        conn = make_connection(item_count=25)
+        chunks = list(conn.items(chunk_size=10))
+        assert all(isinstance(chunk, pd.DataFrame) for chunk in chunks)
+        assert all(len(chunk) <= 10 for chunk in chunks)
+        df = pd.concat(chunks).sort_index()
+        pd.testing.assert_frame_equal(df, conn.items(ignore_cache=True).sort_index())
+
+    def test_chunk_size_overrides_limit(self, make_connection: MakeConnection) -> None:
+        conn = make_connection(item_count=25)
+        chunks = list(conn.items(chunk_size=10, Limit=3))
+        assert max(map(len, chunks)) == 10
+        assert sum(map(len, chunks)) == 25
+
+    def test_parallel_chunks(self, make_connection: MakeConnection) -> None:
+        conn = make_connection(item_count=25)
+        chunks = list(conn.items(chunk_size=4, total_segments=3))
+        assert all(len(chunk) <= 4 for chunk in chunks)
+        assert sorted(pd.concat(chunks).index) == sorted(f"key{i}" for i in range(25))
+
+    def test_raw_api_ignores_chunk_size(self, make_connection: MakeConnection) -> None:
+        conn = make_connection(item_count=5, api_type="raw")
+        items = list(conn.items(chunk_size=2))
+        assert sorted(item["pk"] for item in items) == [f"key{i}" for i in range(5)]
+
+
+def _overwrite_value(conn: DynamoDBConnection, key: str, value: int) -> None:
+    """Overwrites an item with another client, without the knowledge of the connection."""
+    conn.mapping.table.put_item(Item={"pk": key, "value": value})
+
+
+class TestRawItemCache:
+
+    def test_raw_get_item_is_served_from_the_cache(
+        self, make_connection: MakeConnection
+    ) -> None:
+        conn = make_connection(item_count=2, api_type="raw")
+        assert conn.get_item("key0")["value"] == 0
+        _overwrite_value(conn, "key0", 10)
+        assert conn.get_item("key0")["value"] == 0
+        assert conn.get_item("key0", ignore_cache=True)["value"] == 10
+
+    def test_mapping_reads_are_not_cached(self, make_connection: MakeConnection) -> None:
+        conn = make_connection(item_count=2, api_type="raw")
+        assert conn.get_item("key0")["value"] == 0
+        _overwrite_value(conn, "key0", 10)
+        assert conn.mapping["key0"]["value"] == 10
+        conn.mapping.table.delete_item(Key={"pk": "key1"})
+        assert "key1" not in conn.mapping
+
+    def test_writes_of_the_mapping_discard_the_cached_items(
+        self, make_connection: MakeConnection
+    ) -> None:
+        conn = make_connection(item_count=2, api_type="raw")
+        assert conn.get_item("key0")["value"] == 0
+        _overwrite_value(conn, "key0", 10)
+        # A write of another item, through the mapping shared by the sessions.
+        conn.mapping["key1"] = {"value": 11}
+        assert conn.get_item("key0")["value"] == 10
+        conn.set_item("key0", {"value": 20})
+        assert conn.get_item("key0")["value"] == 20
+
+    def test_returns_a_copy_of_the_cached_item(self, make_connection: MakeConnection) -> None:
+        conn = make_connection(api_type="raw")
+        conn.set_item("key0", {"tags": ["a"]})
+        # Modified in place, that is not written to the table.
+        conn.get_item("key0")["tags"].append("b")
+        assert conn.get_item("key0")["tags"] == ["a"]
+
+
+class TestSetItems:
+
+    def test_writes_a_dataframe_of_items(self, make_connection: MakeConnection) -> None:
+        conn = make_connection()
+        conn.mapping.set_items(SPARSE_ITEMS)
+        df = conn.items(ignore_cache=True)
+        conn.del_items(df.index)
+        assert not list(conn.mapping.keys())
+        conn.set_items(df)
+        assert sorted(conn.mapping.values(), key=lambda item: item["pk"]) == SPARSE_ITEMS
+
+    def test_drops_the_missing_cells_of_a_dataframe(
+        self, make_connection: MakeConnection
+    ) -> None:
+        conn = make_connection()
+        df = pd.DataFrame(
+            {"value": [Decimal(1), None], "tags": [["x"], float("nan")], "text": ["a", None]},
+            index=pd.Index(["a", "b"], name="pk"),
+        )
+        conn.set_items(df)
+        assert conn.mapping["a"] == {"pk": "a", "value": 1, "tags": ["x"], "text": "a"}
+        assert conn.mapping["b"] == {"pk": "b"}
+
+    def test_writes_an_iterable_of_items(self, make_connection: MakeConnection) -> None:
+        conn = make_connection()
+        conn.set_items(iter(SPARSE_ITEMS))
+        assert len(list(conn.mapping.keys())) == 3
+
+
+class TestProjectionAndFilter:
+
+    @pytest.fixture
+    def conn(self, make_connection: MakeConnection) -> DynamoDBConnection:
+        conn = make_connection()
+        # "name" and "status" are reserved words of the DynamoDB expressions.
+        conn.mapping.set_items(
+            {"pk": f"key{i}", "value": i, "name": f"item {i}", "status": i % 2}
+            for i in range(10)
+        )
+        return conn
+
+    def test_columns(self, conn: DynamoDBConnection) -> None:
+        df = conn.items(columns=["name", "status"])
+        assert list(df.columns) == ["name", "status"]
+        assert df.index.name == "pk"
+        assert df.loc["key3", "name"] == "item 3"
+
+    def test_filter_expression(self, conn: DynamoDBConnection) -> None:
+        df = conn.items(filter_expression=Attr("status").eq(1) & Attr("value").gt(4))
+        assert sorted(df.index) == ["key5", "key7", "key9"]
+
+    def test_columns_and_filter_expression(self, conn: DynamoDBConnection) -> None:
+        df = conn.items(columns=["name"], filter_expression=Attr("status").eq(0))
+        assert list(df.columns) == ["name"]
+        assert sorted(df.index) == ["key0", "key2", "key4", "key6", "key8"]
+
+    def test_keeps_the_expression_parameters_of_the_caller(
+        self, conn: DynamoDBConnection
+    ) -> None:
+        items = list(conn.items(
+            api_type="raw",
+            columns=["name"],
+            FilterExpression="#v < :v AND #s = :s",
+            ExpressionAttributeNames={"#v": "value", "#s": "status"},
+            ExpressionAttributeValues={":v": 5, ":s": 0},
+        ))
+        assert sorted(item["pk"] for item in items) == ["key0", "key2", "key4"]
+        assert set(items[0]) == {"pk", "name"}
+
+
+class TestArrow:
+
+    def test_returns_a_table_with_the_key_columns_first(
+        self, make_connection: MakeConnection
+    ) -> None:
+        conn = make_connection(composite=True)
+        conn.mapping.set_items([
+            {"value": 1, "pk": "a", "sk": 2, "text": "first"},
+            {"value": 2, "sk": 1, "pk": "b"},
+        ])
+        table = conn.items(api_type="arrow", ignore_cache=True)
+        assert isinstance(table, pa.Table)
+        assert table.column_names[:2] == ["pk", "sk"]
+        rows = sorted(table.to_pylist(), key=lambda row: row["pk"])
+        assert rows == [
+            {"pk": "a", "sk": 2, "value": 1, "text": "first"},
+            {"pk": "b", "sk": 1, "value": 2, "text": None},
+        ]
+
+    def test_converts_mixed_values_to_strings(
+        self, make_connection: MakeConnection
+    ) -> None:
+        conn = make_connection()
+        conn.mapping.set_items([
+            {"pk": "a", "mixed": 1, "tags": {"x"}},
+            {"pk": "b", "mixed": "text"},
+        ])
+        table = conn.items(api_type="arrow", ignore_cache=True).sort_by("pk")
+        assert table.column("mixed").to_pylist() == ["1", "text"]
+        assert table.column("tags").to_pylist() == [["x"], None]
+
+    def test_chunks_and_get_items(self, make_connection: MakeConnection) -> None:
+        conn = make_connection(item_count=12, api_type="arrow")
+        chunks = list(conn.items(chunk_size=5))
+        assert all(isinstance(chunk, pa.Table) and chunk.num_rows <= 5 for chunk in chunks)
+        assert sum(chunk.num_rows for chunk in chunks) == 12
+        table = conn.get_items(["key1", "key2"])
+        assert sorted(table.column("pk").to_pylist()) == ["key1", "key2"]
+
+
+class TestItemSeries:
+
+    @pytest.mark.parametrize("ignore_cache", [True, False])
+    def test_key_attributes_come_first(
+        self, make_connection: MakeConnection, ignore_cache: bool
+    ) -> None:
+        conn = make_connection(composite=True)
+        conn.mapping.set_item(("a", 1), {"value": 1, "text": "first"})
+        series = conn.get_item(("a", 1), ignore_cache=ignore_cache)
+        assert series.index.tolist()[:2] == ["pk", "sk"]
+        assert sorted(series.index[2:]) == ["text", "value"]
+        assert series.name == "value"
+        assert series.to_dict() == {"pk": "a", "sk": 1, "value": 1, "text": "first"}
+
+    def test_set_item_writes_a_series_under_its_key(self, make_connection: MakeConnection) -> None:
+        conn = make_connection()
+        series = pd.Series({"value": Decimal(1), "text": "first"})
+        conn.set_item("a", series)
+        assert series.to_dict() == {"value": Decimal(1), "text": "first"}
+        assert conn.mapping["a"] == {"pk": "a", "value": 1, "text": "first"}
+
+
+def test_pandas_and_pyarrow_are_imported_on_first_use() -> None:
+    code = (
+        "import sys\n"
+        "import dynamodb_connection\n"
+        "assert 'pandas' not in sys.modules and 'pyarrow' not in sys.modules\n"
+    )
+    # Run from the root of the repository, where the package can be imported.
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parents[1])
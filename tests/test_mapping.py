@@ -0,0 +1,1346 @@
+import asyncio
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+import pytest
+from boto3.dynamodb.conditions import Attr
+
+from dynamodb_connection import DynamoDBTableMapping
+from dynamodb_connection import mapping as mapping_module
+
+MakeMapping = Callable[..., DynamoDBTableMapping]
+RecordRequests = Callable[[Any, str], List[Dict[str, Any]]]
+
+
+class StrKey(str):
+    pass
+
+
+class TestParallelScan:
+
+    @pytest.mark.parametrize("total_segments", [2, 4, 7])
+    def test_returns_the_items_of_the_serial_scan(
+        self, make_mapping: MakeMapping, total_segments: int
+    ) -> None:
+        mapping = make_mapping(item_count=50)
+        serial = sorted(item["pk"] for item in mapping.scan(Limit=7))
+        parallel = sorted(
+            item["pk"] for item in mapping.scan(total_segments=total_segments, Limit=7)
+        )
+        assert serial == sorted(f"key{i}" for i in range(50))
+        assert parallel == serial
+
+    def test_passes_the_scan_parameters_to_each_segment(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=30)
+        items = list(mapping.scan(
+            total_segments=3,
+            FilterExpression="#v < :v",
+            ExpressionAttributeNames={"#v": "value"},
+            ExpressionAttributeValues={":v": 10},
+        ))
+        assert sorted(item["value"] for item in items) == list(range(10))
+
+    def test_raises_the_errors_of_the_segments(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=5)
+        with pytest.raises(mapping._client.exceptions.ClientError):
+            list(mapping.scan(total_segments=2, IndexName="missing_index"))
+
+
+class TestConsistentReads:
+
+    def test_reads_are_eventually_consistent(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        get_requests = record_requests(mapping._client, "GetItem")
+        scan_requests = record_requests(mapping._client, "Scan")
+        assert mapping["key0"]["value"] == 0
+        assert len(list(mapping.scan())) == 3
+        assert "ConsistentRead" not in get_requests[0]
+        assert "ConsistentRead" not in scan_requests[0]
+
+    def test_first_read_after_a_write_is_strongly_consistent(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        requests = record_requests(mapping._client, "GetItem")
+        mapping["key0"] = {"value": 10}
+        assert mapping["key0"]["value"] == 10
+        assert mapping["key1"]["value"] == 1
+        assert [r.get("ConsistentRead") for r in requests] == [True, None]
+
+    def test_scan_after_a_write_is_strongly_consistent(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        requests = record_requests(mapping._client, "Scan")
+        mapping.modify_item("key0", {"value": 10})
+        assert len(list(mapping.scan(total_segments=2))) == 3
+        assert all(r.get("ConsistentRead") for r in requests)
+
+    def test_force_consistent(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        requests = record_requests(mapping._client, "GetItem")
+        mapping.get_item("key0", force_consistent=True)
+        assert requests[0]["ConsistentRead"] is True
+
+    def test_explicit_consistent_read_is_kept(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        requests = record_requests(mapping._client, "GetItem")
+        mapping["key0"] = {"value": 10}
+        mapping.get_item("key0", ConsistentRead=False)
+        assert requests[0]["ConsistentRead"] is False
+
+
+class TestReadCapacityFraction:
+
+    @pytest.fixture
+    def sleeps(self, monkeypatch: pytest.MonkeyPatch) -> List[float]:
+        """The delays the scans sleep for, without sleeping."""
+        delays: List[float] = []
+        monkeypatch.setattr(mapping_module.time, "sleep", delays.append)
+        return delays
+
+    def test_slows_down_the_scan_of_a_provisioned_table(
+        self,
+        session: Any,
+        create_table: Callable[..., str],
+        record_requests: RecordRequests,
+        sleeps: List[float],
+    ) -> None:
+        table_name = create_table(
+            item_count=10,
+            ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5},
+        )
+        mapping = DynamoDBTableMapping(table_name, boto3_session=session)
+        requests = record_requests(mapping._client, "Scan")
+        items = list(mapping.scan(read_capacity_fraction=0.5, Limit=3, prefetch=0))
+        assert len(items) == 10
+        assert all(r["ReturnConsumedCapacity"] == "TOTAL" for r in requests)
+        # Each page consumes one capacity unit of the 2.5 units per second.
+        assert len(sleeps) == 4
+        assert all(0 < delay <= 0.4 for delay in sleeps)
+
+    def test_divides_the_capacity_between_the_segments(
+        self, session: Any, create_table: Callable[..., str], sleeps: List[float]
+    ) -> None:
+        table_name = create_table(
+            item_count=10,
+            ProvisionedThroughput={"ReadCapacityUnits": 4, "WriteCapacityUnits": 4},
+        )
+        mapping = DynamoDBTableMapping(table_name, boto3_session=session)
+        items = list(mapping.scan(read_capacity_fraction=1.0, total_segments=2, Limit=3))
+        assert len(items) == 10
+        assert sleeps
+        # Each page consumes one capacity unit of the 2 units per second of its segment.
+        assert all(0 < delay <= 0.5 for delay in sleeps)
+
+    def test_ignored_for_on_demand_tables(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests, sleeps: List[float]
+    ) -> None:
+        mapping = make_mapping(item_count=10)
+        requests = record_requests(mapping._client, "Scan")
+        assert len(list(mapping.scan(read_capacity_fraction=0.5, Limit=3, prefetch=0))) == 10
+        assert not any("ReturnConsumedCapacity" in r for r in requests)
+        assert not sleeps
+
+
+class TestViewMembership:
+
+    def test_values_membership_compares_the_stored_item(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=20)
+        scans = record_requests(mapping._client, "Scan")
+        values = mapping.values()
+        assert {"pk": "key3", "value": 3} in values
+        assert {"pk": "key3", "value": 4} not in values
+        assert {"pk": "missing", "value": 3} not in values
+        assert {"value": 3} not in values
+        assert "key3" not in values
+        # Looked up by the key, without scanning the table.
+        assert not scans
+
+    def test_items_membership_compares_the_stored_item(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=20)
+        scans = record_requests(mapping._client, "Scan")
+        items = mapping.items()
+        assert ("key3", {"pk": "key3", "value": 3}) in items
+        assert ("key3", {"pk": "key3", "value": 4}) not in items
+        assert ("key4", {"pk": "key3", "value": 3}) not in items
+        assert ("key3", "value") not in items
+        assert "key3" not in items
+        assert not scans
+
+    def test_membership_with_composite_keys(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=6, composite=True)
+        assert {"pk": "key4", "sk": 1, "value": 4} in mapping.values()
+        assert {"pk": "key4", "sk": 2, "value": 4} not in mapping.values()
+        assert {"pk": "key4", "value": 4} not in mapping.values()
+        assert (("key4", 1), {"pk": "key4", "sk": 1, "value": 4}) in mapping.items()
+        assert ("key4", {"pk": "key4", "sk": 1, "value": 4}) not in mapping.items()
+
+    def test_membership_of_projected_views(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=3)
+        mapping.modify_item("key1", {"extra": "x"})
+        assert {"pk": "key1", "value": 1} in mapping.values(projection=["value"])
+        assert {"pk": "key1", "value": 1} not in mapping.values()
+
+
+class TestGetItems:
+
+    def test_returns_the_existing_items(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=250)
+        # The duplicate keys of a batch are requested once.
+        keys = ["key0", "missing"] + [f"key{i}" for i in range(0, 250, 2)]
+        items = list(mapping.get_items(keys))
+        assert sorted(item["pk"] for item in items) == sorted(set(keys) - {"missing"})
+        assert all(item["value"] == int(item["pk"][3:]) for item in items)
+
+    def test_sends_batches_of_100_keys(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=250)
+        requests = record_requests(mapping._client, "BatchGetItem")
+        assert len(list(mapping.get_items(f"key{i}" for i in range(250)))) == 250
+        batch_sizes = [len(r["RequestItems"][mapping.table_name]["Keys"]) for r in requests]
+        assert batch_sizes == [100, 100, 50]
+
+    @pytest.mark.parametrize("prefetch", [0, 1, 3])
+    def test_unprocessed_keys_are_requested_again(
+        self, make_mapping: MakeMapping, monkeypatch: pytest.MonkeyPatch, prefetch: int
+    ) -> None:
+        mapping = make_mapping(item_count=150)
+        batch_get_item = mapping._client.batch_get_item
+        requests: List[Dict[str, Any]] = []
+
+        def throttled_batch_get_item(RequestItems: Dict[str, Any]) -> Dict[str, Any]:
+            requests.append(RequestItems)
+            if len(requests) == 1:
+                return {"Responses": {}, "UnprocessedKeys": RequestItems}
+            return batch_get_item(RequestItems=RequestItems)
+
+        monkeypatch.setattr(mapping._client, "batch_get_item", throttled_batch_get_item)
+        keys = [f"key{i}" for i in range(150)]
+        items = list(mapping.get_items(keys, prefetch=prefetch))
+        assert sorted(item["pk"] for item in items) == sorted(keys)
+        # Two batches of at most 100 keys, and the retry of the first one.
+        assert len(requests) == 3
+        assert requests[0] == requests[1]
+
+    def test_projection(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=3)
+        mapping.modify_item("key1", {"extra": "x"})
+        items = list(mapping.get_items(["key1"], projection=["extra"]))
+        assert items == [{"pk": "key1", "extra": "x"}]
+
+    def test_raises_on_invalid_keys(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=3)
+        with pytest.raises(ValueError):
+            list(mapping.get_items([("key1", 2)], prefetch=0))
+
+
+class TestSetItems:
+
+    def test_writes_batches_of_25_items(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping()
+        requests = record_requests(mapping._client, "BatchWriteItem")
+        mapping.set_items({"pk": f"key{i}", "value": i} for i in range(60))
+        assert sorted(len(r["RequestItems"][mapping.table_name]) for r in requests) == [
+            10, 25, 25
+        ]
+        assert {item["pk"]: item["value"] for item in mapping.scan()} == {
+            f"key{i}": i for i in range(60)
+        }
+
+    def test_writes_the_last_item_of_a_duplicate_key(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping()
+        mapping.set_items([{"pk": "key0", "value": 1}, {"pk": "key0", "value": 2}])
+        assert mapping["key0"]["value"] == 2
+
+    def test_raises_on_items_without_keys(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping()
+        with pytest.raises(KeyError):
+            mapping.set_items([{"value": 1}])
+
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def test_unprocessed_items_are_written_again(
+        self, make_mapping: MakeMapping, monkeypatch: pytest.MonkeyPatch, max_workers: int
+    ) -> None:
+        mapping = make_mapping()
+        batch_write_item = mapping._client.batch_write_item
+        lock = threading.Lock()
+        throttled: List[Dict[str, Any]] = []
+
+        def throttled_batch_write_item(RequestItems: Dict[str, Any]) -> Dict[str, Any]:
+            with lock:
+                if not throttled:
+                    # Only the second half of the first batch is written.
+                    items = RequestItems[mapping.table_name]
+                    throttled.append(RequestItems)
+                    batch_write_item(RequestItems={mapping.table_name: items[:10]})
+                    return {"UnprocessedItems": {mapping.table_name: items[10:]}}
+            return batch_write_item(RequestItems=RequestItems)
+
+        monkeypatch.setattr(mapping._client, "batch_write_item", throttled_batch_write_item)
+        mapping.set_items(
+            ({"pk": f"key{i}", "value": i} for i in range(60)), max_workers=max_workers
+        )
+        assert len(throttled) == 1
+        assert sorted(mapping.keys()) == sorted(f"key{i}" for i in range(60))
+
+
+def _overwrite_value(mapping: DynamoDBTableMapping, key: str, value: int) -> None:
+    """Overwrites an item with another client, that does not invalidate the item cache."""
+    mapping.table.put_item(Item={"pk": key, "value": value})
+
+
+class TestItemCache:
+
+    def test_reads_are_served_from_the_cache(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        _overwrite_value(mapping, "key0", 1)
+        assert mapping["key0"]["value"] == 0
+        assert "key0" in mapping
+        assert mapping.get_item("key0", ignore_cache=True)["value"] == 1
+        assert mapping.get_item("key0", force_consistent=True)["value"] == 1
+
+    def test_disabled_by_default(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1)
+        assert mapping["key0"]["value"] == 0
+        _overwrite_value(mapping, "key0", 1)
+        assert mapping["key0"]["value"] == 1
+
+    def test_items_expire(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16, cache_ttl=0.05)
+        assert mapping["key0"]["value"] == 0
+        _overwrite_value(mapping, "key0", 1)
+        time.sleep(0.1)
+        assert mapping["key0"]["value"] == 1
+
+    def test_least_recently_used_items_are_dropped(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=3, cache_size=2)
+        for key in ["key0", "key1", "key0", "key2"]:
+            mapping.get_item(key)
+        for i in range(3):
+            _overwrite_value(mapping, f"key{i}", 10 + i)
+        # The cached items are checked first, as reading key1 drops the least recently used item.
+        assert [mapping[key]["value"] for key in ["key2", "key0", "key1"]] == [2, 0, 11]
+
+    @pytest.mark.parametrize("write", [
+        lambda mapping: mapping.set_item("key0", {"value": 1}),
+        lambda mapping: mapping.__setitem__("key0", {"value": 1}),
+        lambda mapping: mapping.modify_item("key0", {"value": 1}),
+        lambda mapping: mapping.get_item("key0").__setitem__("value", 1),
+        lambda mapping: mapping.set_items([{"pk": "key0", "value": 1}]),
+        lambda mapping: mapping.update({"key0": {"value": 1}}),
+    ])
+    def test_overwrites_invalidate_the_cache(
+        self, make_mapping: MakeMapping, write: Callable[[DynamoDBTableMapping], Any]
+    ) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        write(mapping)
+        assert mapping["key0"]["value"] == 1
+        assert next(mapping.get_items(["key0"]))["value"] == 1
+
+    @pytest.mark.parametrize("delete", [
+        lambda mapping: mapping.del_item("key0"),
+        lambda mapping: mapping.__delitem__("key0"),
+        lambda mapping: mapping.del_items(["key0"]),
+        lambda mapping: mapping.pop("key0"),
+        lambda mapping: mapping.popitem(),
+        lambda mapping: mapping.clear(),
+    ])
+    def test_deletes_invalidate_the_cache(
+        self, make_mapping: MakeMapping, delete: Callable[[DynamoDBTableMapping], Any]
+    ) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        delete(mapping)
+        with pytest.raises(KeyError):
+            mapping.get_item("key0")
+        assert "key0" not in mapping
+        assert not list(mapping.get_items(["key0"]))
+
+    def test_failed_delete_invalidates_the_cache(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        mapping.table.delete_item(Key={"pk": "key0"})
+        with pytest.raises(KeyError):
+            mapping.del_item("key0")
+        with pytest.raises(KeyError):
+            mapping.get_item("key0")
+
+
+class TestCachedItemCopies:
+
+    @pytest.fixture
+    def mapping(self, make_mapping: MakeMapping) -> DynamoDBTableMapping:
+        mapping = make_mapping(cache_size=16)
+        mapping.table.put_item(Item={"pk": "key0", "tags": ["a"], "meta": {"n": 1}, "s": "x"})
+        return mapping
+
+    def test_nested_attributes_of_get_item_are_copied(
+        self, mapping: DynamoDBTableMapping
+    ) -> None:
+        item = mapping.get_item("key0")
+        item["tags"].append("b")
+        item["meta"]["n"] = 2
+        assert mapping.get_item("key0")["tags"] == ["a"]
+        assert mapping.get_item("key0")["meta"] == {"n": 1}
+
+    def test_nested_attributes_of_get_items_are_copied(
+        self, mapping: DynamoDBTableMapping
+    ) -> None:
+        for _ in range(2):
+            item = next(mapping.get_items(["key0"]))
+            assert item["tags"] == ["a"]
+            item["tags"].append("b")
+
+    def test_only_mutable_values_are_copied(self) -> None:
+        item = {"s": "x", "n": 1, "l": [[1]], "m": {"k": {"v": 1}}, "ss": {"a"}}
+        copied = mapping_module._copy_item(item)
+        assert copied == item
+        assert copied["s"] is item["s"]
+        assert copied["l"] is not item["l"] and copied["l"][0] is not item["l"][0]
+        assert copied["m"]["k"] is not item["m"]["k"]
+        assert copied["ss"] is not item["ss"]
+
+
+class TestDelItems:
+
+    def test_deletes_batches_of_25_keys(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=60)
+        requests = record_requests(mapping._client, "BatchWriteItem")
+        mapping.del_items([f"key{i}" for i in range(50)] + ["missing", "key0"])
+        assert sorted(len(r["RequestItems"][mapping.table_name]) for r in requests) == [
+            2, 25, 25
+        ]
+        assert sorted(mapping.keys()) == sorted(f"key{i}" for i in range(50, 60))
+
+    def test_raises_on_incomplete_keys(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(composite=True)
+        with pytest.raises(ValueError):
+            mapping.del_items(["key0"])
+
+    def test_unprocessed_keys_are_deleted_again(
+        self, make_mapping: MakeMapping, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        mapping = make_mapping(item_count=30)
+        batch_write_item = mapping._client.batch_write_item
+        calls: List[int] = []
+
+        def throttled_batch_write_item(RequestItems: Dict[str, Any]) -> Dict[str, Any]:
+            items = RequestItems[mapping.table_name]
+            calls.append(len(items))
+            if len(calls) == 1:
+                batch_write_item(RequestItems={mapping.table_name: items[:1]})
+                return {"UnprocessedItems": {mapping.table_name: items[1:]}}
+            return batch_write_item(RequestItems=RequestItems)
+
+        monkeypatch.setattr(mapping._client, "batch_write_item", throttled_batch_write_item)
+        mapping.del_items(f"key{i}" for i in range(25))
+        assert calls == [25, 24]
+        assert sorted(mapping.keys()) == sorted(f"key{i}" for i in range(25, 30))
+
+
+class TestCountItems:
+
+    @pytest.mark.parametrize("total_segments", [1, 3])
+    def test_counts_the_items_without_reading_them(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests, total_segments: int
+    ) -> None:
+        mapping = make_mapping(item_count=25)
+        requests = record_requests(mapping._client, "Scan")
+        assert mapping.count_items(total_segments=total_segments, Limit=4) == 25
+        assert {r["Select"] for r in requests} == {"COUNT"}
+
+    @pytest.mark.parametrize("total_segments", [1, 3])
+    def test_counts_the_matching_items(
+        self, make_mapping: MakeMapping, total_segments: int
+    ) -> None:
+        mapping = make_mapping(item_count=25)
+        assert mapping.count_items(
+            total_segments=total_segments,
+            FilterExpression="#v >= :v",
+            ExpressionAttributeNames={"#v": "value"},
+            ExpressionAttributeValues={":v": 20},
+        ) == 5
+
+    def test_keys_are_scanned_without_the_other_attributes(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=5, composite=True)
+        requests = record_requests(mapping._client, "Scan")
+        assert sorted(mapping) == sorted((f"key{i}", i % 3) for i in range(5))
+        assert requests[0]["Select"] == "SPECIFIC_ATTRIBUTES"
+        assert "value" not in requests[0]["ProjectionExpression"]
+
+
+def _read_threads() -> List[threading.Thread]:
+    return [t for t in threading.enumerate() if t.name.startswith("dynamodb-read")]
+
+
+def _wait_for_read_threads(timeout: float = 5.0) -> List[threading.Thread]:
+    """Waits until the background read threads exit, and returns the ones still alive."""
+    deadline = time.monotonic() + timeout
+    while _read_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return _read_threads()
+
+
+class TestScanPrefetch:
+
+    @pytest.mark.parametrize("prefetch", [0, 1, 3])
+    def test_returns_the_pages_in_order(self, make_mapping: MakeMapping, prefetch: int) -> None:
+        mapping = make_mapping(item_count=20)
+        expected = [[item["pk"] for item in page] for page in mapping.scan_pages(Limit=3)]
+        pages = mapping.scan_pages(Limit=3, prefetch=prefetch)
+        assert [[item["pk"] for item in page] for page in pages] == expected
+        assert sorted(sum(expected, [])) == sorted(f"key{i}" for i in range(20))
+
+    def test_pages_are_fetched_on_demand_without_prefetch(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=20)
+        requests = record_requests(mapping._client, "Scan")
+        assert not _wait_for_read_threads()
+        pages = mapping.scan_pages(Limit=3, prefetch=0)
+        next(pages)
+        assert len(requests) == 1
+        assert not _read_threads()
+
+    def test_closing_the_scan_stops_the_prefetch_thread(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=20)
+        items = mapping.scan(Limit=1)
+        next(items)
+        assert _read_threads()
+        items.close()
+        assert not _wait_for_read_threads()
+
+    def test_raises_the_errors_of_the_prefetch_thread(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=5)
+        with pytest.raises(mapping._client.exceptions.ClientError):
+            list(mapping.scan(IndexName="missing_index"))
+
+
+class TestParallelScanWorkers:
+
+    @pytest.mark.parametrize("max_pool_connections, expected", [(None, 10), (16, 16)])
+    def test_workers_are_limited_to_the_connection_pool(
+        self,
+        make_mapping: MakeMapping,
+        max_pool_connections: Any,
+        expected: int,
+    ) -> None:
+        mapping = make_mapping(item_count=64, max_pool_connections=max_pool_connections)
+        assert mapping._client.meta.config.max_pool_connections == expected
+        assert not _wait_for_read_threads()
+        thread_counts: List[int] = []
+
+        def count_threads(**kwargs: Any) -> None:
+            thread_counts.append(len(_read_threads()))
+
+        mapping._client.meta.events.register("before-call.dynamodb.Scan", count_threads)
+        assert len(list(mapping.scan(total_segments=32, Limit=1))) == 64
+        assert 1 < max(thread_counts) <= expected
+
+    def test_the_pool_is_sized_for_the_segments_of_the_mapping(
+        self, make_mapping: MakeMapping
+    ) -> None:
+        mapping = make_mapping(total_segments=16)
+        assert mapping._client.meta.config.max_pool_connections == 16
+
+    def test_closing_the_scan_stops_the_workers(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=40)
+        items = mapping.scan(total_segments=4, Limit=1)
+        next(items)
+        items.close()
+        assert not _wait_for_read_threads()
+
+
+class TestViewSegments:
+
+    @pytest.mark.parametrize("iterate", [
+        lambda mapping: list(mapping),
+        lambda mapping: list(mapping.keys()),
+        lambda mapping: [key for key, _ in mapping.items()],
+        lambda mapping: [item["pk"] for item in mapping.values()],
+    ])
+    def test_views_scan_the_segments_of_the_mapping(
+        self,
+        make_mapping: MakeMapping,
+        record_requests: RecordRequests,
+        iterate: Callable[[DynamoDBTableMapping], List[str]],
+    ) -> None:
+        mapping = make_mapping(item_count=20, total_segments=3)
+        requests = record_requests(mapping._client, "Scan")
+        assert sorted(iterate(mapping)) == sorted(f"key{i}" for i in range(20))
+        assert {(r["Segment"], r["TotalSegments"]) for r in requests} == {
+            (0, 3), (1, 3), (2, 3)
+        }
+
+    def test_views_can_override_the_segments(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=20, total_segments=3)
+        requests = record_requests(mapping._client, "Scan")
+        assert len(list(mapping.values(total_segments=2))) == 20
+        assert {r["TotalSegments"] for r in requests} == {2}
+
+
+class TestDelItemConditions:
+
+    def test_existence_is_checked_by_the_delete(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        get_requests = record_requests(mapping._client, "GetItem")
+        delete_requests = record_requests(mapping._client, "DeleteItem")
+        del mapping["key0"]
+        with pytest.raises(KeyError):
+            del mapping["key0"]
+        assert not get_requests
+        assert len(delete_requests) == 2
+        assert "attribute_exists" in delete_requests[0]["ConditionExpression"]
+
+    def test_missing_keys_raise_key_error(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1)
+        with pytest.raises(KeyError):
+            mapping.del_item("missing")
+        mapping.del_item("missing", check_existing=False)
+        mapping.del_item("key0")
+        assert "key0" not in mapping
+
+    @pytest.mark.parametrize("condition_kwargs", [
+        {
+            "ConditionExpression": "#v = :v",
+            "ExpressionAttributeNames": {"#v": "value"},
+            "ExpressionAttributeValues": {":v": 0},
+        },
+        {"ConditionExpression": Attr("value").eq(0)},
+    ])
+    def test_conditions_are_combined_with_the_existence_check(
+        self, make_mapping: MakeMapping, condition_kwargs: Dict[str, Any]
+    ) -> None:
+        mapping = make_mapping(item_count=2)
+        with pytest.raises(mapping._client.exceptions.ConditionalCheckFailedException):
+            mapping.del_item("key1", **condition_kwargs)
+        with pytest.raises(KeyError):
+            mapping.del_item("missing", **condition_kwargs)
+        mapping.del_item("key0", **condition_kwargs)
+        assert sorted(mapping.keys()) == ["key1"]
+
+    def test_conditions_without_the_existence_check(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1)
+        mapping.del_item(
+            "missing", check_existing=False, ConditionExpression=Attr("value").not_exists()
+        )
+        with pytest.raises(mapping._client.exceptions.ConditionalCheckFailedException):
+            mapping.del_item(
+                "key0", check_existing=False, ConditionExpression=Attr("value").not_exists()
+            )
+
+
+class TestTransaction:
+
+    def test_writes_are_committed_in_one_request(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        requests = record_requests(mapping._client, "TransactWriteItems")
+        with mapping.transaction():
+            mapping["new"] = {"value": 10}
+            mapping.modify_item("key0", {"value": 11})
+            del mapping["key1"]
+            assert "new" not in mapping
+        assert len(requests) == 1
+        assert {key: item["value"] for key, item in mapping.items()} == {
+            "new": 10, "key0": 11, "key2": 2
+        }
+
+    @pytest.mark.parametrize("writes, expected", [
+        ([("set", {"value": 1, "a": 1}), ("modify", {"value": 2, "a": None})], {"value": 2}),
+        ([("modify", {"value": 1}), ("modify", {"a": 2})], {"value": 1, "a": 2}),
+        ([("delete", None), ("modify", {"a": 2, "b": None})], {"a": 2}),
+        ([("set", {"value": 1}), ("delete", None)], None),
+        ([("delete", None), ("set", {"value": 1})], {"value": 1}),
+    ])
+    def test_writes_of_the_same_key_are_merged(
+        self, make_mapping: MakeMapping, writes: List[Any], expected: Any
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        with mapping.transaction():
+            for kind, payload in writes:
+                if kind == "set":
+                    mapping.set_item("key0", payload)
+                elif kind == "modify":
+                    mapping.modify_item("key0", payload)
+                else:
+                    mapping.del_item("key0")
+        if expected is None:
+            assert "key0" not in mapping
+        else:
+            assert mapping["key0"] == {"pk": "key0", **expected}
+
+    def test_writes_with_parameters_are_not_merged(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1)
+        with pytest.raises(ValueError):
+            with mapping.transaction():
+                mapping.set_item("key0", {"value": 1})
+                mapping.del_item("key0", ConditionExpression=Attr("value").eq(1))
+
+    def test_an_exception_discards_the_writes(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        requests = record_requests(mapping._client, "TransactWriteItems")
+        with pytest.raises(ZeroDivisionError):
+            with mapping.transaction():
+                mapping["key0"] = {"value": 1}
+                1 / 0
+        assert not requests
+        assert mapping["key0"]["value"] == 0
+
+    def test_a_cancelled_transaction_writes_nothing(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        with pytest.raises(mapping._client.exceptions.TransactionCanceledException):
+            with mapping.transaction():
+                mapping["new"] = {"value": 1}
+                mapping.modify_item("key0", {"value": 2}, ConditionExpression=Attr("value").eq(1))
+        assert "new" not in mapping
+        assert mapping["key0"]["value"] == 0
+
+    def test_the_writes_invalidate_the_cache(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        with mapping.transaction():
+            mapping["key0"] = {"value": 1}
+        assert mapping["key0"]["value"] == 1
+
+    @pytest.mark.parametrize("write", [
+        lambda mapping: mapping.set_items([{"pk": "key0"}]),
+        lambda mapping: mapping.del_items(["key0"]),
+        lambda mapping: mapping.update({"key0": {}}),
+        lambda mapping: mapping.clear(),
+        lambda mapping: mapping.pop("key0"),
+        lambda mapping: mapping.popitem(),
+        lambda mapping: mapping.transaction().__enter__(),
+    ])
+    def test_bulk_writes_and_nested_transactions_raise(
+        self, make_mapping: MakeMapping, write: Callable[[DynamoDBTableMapping], Any]
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        with pytest.raises(RuntimeError):
+            with mapping.transaction():
+                write(mapping)
+        assert mapping["key0"]["value"] == 0
+
+    def test_transactions_are_per_thread(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1)
+        with mapping.transaction():
+            thread = threading.Thread(target=mapping.set_item, args=("other", {"value": 1}))
+            thread.start()
+            thread.join()
+            assert mapping["other"]["value"] == 1
+
+
+class TestViewLookups:
+
+    @pytest.mark.parametrize("contains", [
+        lambda mapping: {"pk": "key0", "value": 0} in mapping.values(),
+        lambda mapping: ("key0", {"pk": "key0", "value": 0}) in mapping.items(),
+    ])
+    def test_membership_gets_a_single_item(
+        self,
+        make_mapping: MakeMapping,
+        record_requests: RecordRequests,
+        contains: Callable[[DynamoDBTableMapping], bool],
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        get_requests = record_requests(mapping._client, "GetItem")
+        scan_requests = record_requests(mapping._client, "Scan")
+        assert contains(mapping)
+        assert len(get_requests) == 1
+        assert not scan_requests
+
+    @pytest.mark.parametrize("contains", [
+        lambda mapping: {"pk": ["key0"], "value": 0} in mapping.values(),
+        lambda mapping: (["key0"], {"pk": ["key0"], "value": 0}) in mapping.items(),
+        lambda mapping: {"value": 0} in mapping.values(),
+        lambda mapping: "key0" in mapping.values(),
+    ])
+    def test_values_without_valid_keys_are_not_contained(
+        self, make_mapping: MakeMapping, contains: Callable[[DynamoDBTableMapping], bool]
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        assert not contains(mapping)
+
+
+class TestMissingKeys:
+
+    @pytest.mark.parametrize("view_name, probe", [
+        ("keys", "missing"),
+        ("values", {"pk": "missing", "value": 0}),
+        ("items", ("missing", {"pk": "missing", "value": 0})),
+    ])
+    def test_missing_keys_are_remembered_until_a_write(
+        self,
+        make_mapping: MakeMapping,
+        record_requests: RecordRequests,
+        view_name: str,
+        probe: Any,
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        view = getattr(mapping, view_name)()
+        requests = record_requests(mapping._client, "GetItem")
+        for _ in range(3):
+            assert probe not in view
+        assert len(requests) == 1
+        mapping["missing"] = {"value": 0}
+        assert probe in view
+        assert len(requests) == 2
+
+    def test_the_number_of_missing_keys_is_limited(
+        self, make_mapping: MakeMapping, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(mapping_module, "_MISSING_KEYS_CACHE_SIZE", 2)
+        mapping = make_mapping()
+        missing_keys = mapping_module._MissingKeys(mapping)
+        for key in ["a", "b", "c"]:
+            missing_keys.add((key,))
+        assert ("a",) not in missing_keys
+        assert ("b",) in missing_keys and ("c",) in missing_keys
+
+
+class TestAsyncScan:
+
+    @pytest.mark.parametrize("total_segments", [1, 3])
+    def test_yields_all_items(self, make_mapping: MakeMapping, total_segments: int) -> None:
+        mapping = make_mapping(item_count=20)
+
+        async def scan() -> List[str]:
+            return [item["pk"] async for item in mapping.ascan(
+                total_segments=total_segments, Limit=3
+            )]
+
+        assert sorted(asyncio.run(scan())) == sorted(f"key{i}" for i in range(20))
+
+    def test_closing_stops_the_workers(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=20)
+
+        async def first_item() -> Any:
+            items = mapping.ascan(total_segments=2, Limit=1)
+            item = await items.__anext__()
+            await items.aclose()
+            return item
+
+        assert asyncio.run(first_item())["pk"].startswith("key")
+        assert not _wait_for_read_threads()
+
+    def test_cancelling_stops_the_workers(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=20)
+
+        async def cancel() -> None:
+            started = asyncio.Event()
+
+            async def consume() -> None:
+                async for _ in mapping.ascan(Limit=1):
+                    started.set()
+                    await asyncio.sleep(1)
+
+            task = asyncio.ensure_future(consume())
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+        assert not _wait_for_read_threads()
+
+
+class TestItemCount:
+
+    def test_the_item_count_is_described_once_in_its_ttl(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        requests = record_requests(mapping._client, "DescribeTable")
+        assert len(mapping) == 3
+        mapping["new"] = {"value": 3}
+        assert len(mapping) == 3
+        assert not requests
+        assert mapping.refresh_item_count() == 4
+        assert len(requests) == 1
+
+    def test_the_item_count_is_described_again_after_its_ttl(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        mapping.item_count_ttl = 0
+        requests = record_requests(mapping._client, "DescribeTable")
+        mapping["new"] = {"value": 3}
+        assert len(mapping) == 4
+        assert len(requests) == 1
+
+
+class TestSharedTableDescription:
+
+    def test_the_table_is_described_once_per_session(
+        self,
+        session: Any,
+        make_mapping: MakeMapping,
+        record_requests: RecordRequests,
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        # The mappings share the client of the session, and so the recorded requests.
+        requests = record_requests(mapping._client, "DescribeTable")
+        other = DynamoDBTableMapping(mapping.table_name, boto3_session=session)
+        assert other.key_names == ("pk",)
+        assert len(other) == 3
+        assert not requests
+        other.refresh_item_count()
+        assert len(requests) == 1
+
+
+class TestDictMethods:
+
+    def test_pop_deletes_and_returns_the_item_in_one_request(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=2)
+        get_requests = record_requests(mapping._client, "GetItem")
+        delete_requests = record_requests(mapping._client, "DeleteItem")
+        assert mapping.pop("key0") == {"pk": "key0", "value": 0}
+        assert not get_requests
+        assert len(delete_requests) == 1
+        assert sorted(mapping.keys()) == ["key1"]
+
+    def test_pop_of_a_missing_key(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping()
+        with pytest.raises(KeyError):
+            mapping.pop("missing")
+        assert mapping.pop("missing", None) is None
+
+    @pytest.mark.parametrize("update", [
+        lambda mapping: mapping.update({"a": {"value": 1}, "b": {"value": 2}}),
+        lambda mapping: mapping.update([("a", {"value": 1}), ("b", {"value": 2})]),
+        lambda mapping: mapping.update(a={"value": 1}, b={"value": 2}),
+        lambda mapping: mapping.update({"a": {"value": 1}}, b={"value": 2}),
+    ])
+    def test_update_writes_the_items_in_batches(
+        self,
+        make_mapping: MakeMapping,
+        record_requests: RecordRequests,
+        update: Callable[[DynamoDBTableMapping], None],
+    ) -> None:
+        mapping = make_mapping()
+        requests = record_requests(mapping._client, "BatchWriteItem")
+        update(mapping)
+        assert len(requests) == 1
+        assert {key: item["value"] for key, item in mapping.items()} == {"a": 1, "b": 2}
+
+    def test_update_does_not_modify_the_items(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping()
+        item = {"value": 1}
+        mapping.update({"a": item})
+        assert item == {"value": 1}
+        assert mapping["a"] == {"pk": "a", "value": 1}
+
+    def test_clear_deletes_the_items_in_batches(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=30)
+        requests = record_requests(mapping._client, "BatchWriteItem")
+        mapping.clear()
+        assert len(requests) == 2
+        assert not list(mapping.keys())
+
+
+class TestPopItem:
+
+    def test_pops_an_item_with_a_key_scan_and_a_delete(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+        scan_requests = record_requests(mapping._client, "Scan")
+        delete_requests = record_requests(mapping._client, "DeleteItem")
+        key, item = mapping.popitem()
+        assert item == {"pk": key, "value": int(key[3:])}
+        assert key not in mapping
+        assert [r["Limit"] for r in scan_requests] == [1]
+        assert "value" not in scan_requests[0]["ProjectionExpression"]
+        assert len(delete_requests) == 1
+
+    def test_pops_all_items(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=3)
+        keys = {mapping.popitem()[0] for _ in range(3)}
+        assert keys == {"key0", "key1", "key2"}
+        with pytest.raises(KeyError):
+            mapping.popitem()
+
+
+class TestItemAccessor:
+
+    def test_assignments_are_written_immediately(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        requests = record_requests(mapping._client, "UpdateItem")
+        item = mapping["key0"]
+        item["a"] = 1
+        item["b"] = 2
+        assert len(requests) == 2
+        assert mapping["key0"] == {"pk": "key0", "value": 0, "a": 1, "b": 2}
+
+    def test_assignments_in_a_with_block_are_written_at_once(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        requests = record_requests(mapping._client, "UpdateItem")
+        with mapping["key0"] as item:
+            item["a"] = 1
+            item["b"] = 2
+            item.update(c=3)
+            assert item == {"pk": "key0", "value": 0, "a": 1, "b": 2, "c": 3}
+            assert not requests
+        assert len(requests) == 1
+        assert mapping["key0"] == {"pk": "key0", "value": 0, "a": 1, "b": 2, "c": 3}
+
+    def test_update_writes_its_fields_at_once(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        requests = record_requests(mapping._client, "UpdateItem")
+        mapping["key0"].update({"a": 1, "value": None})
+        assert len(requests) == 1
+        assert mapping["key0"] == {"pk": "key0", "a": 1}
+
+
+class TestItemsViewWithoutRequests:
+
+    @pytest.mark.parametrize("pair", [
+        ("key0", {"pk": "key1", "value": 0}),
+        ("key0", {"value": 0}),
+        ("key0", "not an item"),
+        (("key0", 1), {"pk": "key0", "value": 0}),
+        ("key0",),
+    ])
+    def test_pairs_that_can_not_be_stored_are_decided_without_a_request(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests, pair: Any
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        requests = record_requests(mapping._client, "GetItem")
+        assert pair not in mapping.items()
+        assert not requests
+
+
+class TestBulkReadCache:
+
+    def test_cached_items_are_not_requested_again(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=3, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        requests = record_requests(mapping._client, "BatchGetItem")
+        items = list(mapping.get_items(["key0", "key1"]))
+        assert sorted(item["pk"] for item in items) == ["key0", "key1"]
+        assert [r["RequestItems"][mapping.table_name]["Keys"] for r in requests] == [
+            [{"pk": {"S": "key1"}}]
+        ]
+        _overwrite_value(mapping, "key1", 10)
+        assert mapping["key1"]["value"] == 1
+
+    def test_consistent_reads_bypass_the_cache(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        _overwrite_value(mapping, "key0", 10)
+        requests = record_requests(mapping._client, "BatchGetItem")
+        assert next(mapping.get_items(["key0"], force_consistent=True))["value"] == 10
+        assert len(requests) == 1
+
+
+class TestProjectedViews:
+
+    @pytest.fixture
+    def mapping(self, make_mapping: MakeMapping) -> DynamoDBTableMapping:
+        mapping = make_mapping()
+        mapping.set_items({"pk": f"key{i}", "value": i, "other": "x"} for i in range(3))
+        return mapping
+
+    def test_values_contain_the_projected_and_key_attributes(
+        self, mapping: DynamoDBTableMapping
+    ) -> None:
+        assert sorted(mapping.values(projection=["value"]), key=lambda item: item["pk"]) == [
+            {"pk": f"key{i}", "value": i} for i in range(3)
+        ]
+
+    def test_items_contain_the_projected_and_key_attributes(
+        self, mapping: DynamoDBTableMapping
+    ) -> None:
+        assert dict(mapping.items(projection=["other"])) == {
+            f"key{i}": {"pk": f"key{i}", "other": "x"} for i in range(3)
+        }
+
+
+class TestProjectedGetItems:
+
+    def test_items_contain_the_projected_and_key_attributes(
+        self, make_mapping: MakeMapping
+    ) -> None:
+        mapping = make_mapping(composite=True, item_count=3)
+        items = list(mapping.get_items([("key0", 0), ("key1", 1)], projection=[]))
+        assert sorted(items, key=lambda item: item["pk"]) == [
+            {"pk": "key0", "sk": 0}, {"pk": "key1", "sk": 1}
+        ]
+
+    def test_projected_items_are_not_cached(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert next(mapping.get_items(["key0"], projection=["pk"])) == {"pk": "key0"}
+        assert mapping["key0"] == {"pk": "key0", "value": 0}
+
+
+class TestKeyMembership:
+
+    @pytest.mark.parametrize("contains", [
+        lambda mapping, key: key in mapping,
+        lambda mapping, key: key in mapping.keys(),
+    ])
+    def test_gets_only_the_key_attributes(
+        self,
+        make_mapping: MakeMapping,
+        record_requests: RecordRequests,
+        contains: Callable[[DynamoDBTableMapping, Any], bool],
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        requests = record_requests(mapping._client, "GetItem")
+        assert contains(mapping, "key0")
+        assert not contains(mapping, "missing")
+        assert [r["ExpressionAttributeNames"] for r in requests] == [{"#p0": "pk"}] * 2
+
+    @pytest.mark.parametrize("key", [("key0", 0, 1), 1, b"key0", None])
+    def test_malformed_keys_are_not_contained(self, make_mapping: MakeMapping, key: Any) -> None:
+        mapping = make_mapping(item_count=1)
+        assert key not in mapping
+        assert key not in mapping.keys()
+
+    def test_projects_only_the_hash_key_of_composite_keys(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1, composite=True)
+        requests = record_requests(mapping._client, "GetItem")
+        assert ("key0", 0) in mapping
+        assert ("key0", 1) not in mapping
+        assert [r["ExpressionAttributeNames"] for r in requests] == [{"#p0": "pk"}] * 2
+
+    def test_cached_keys_are_contained_without_a_request(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1, cache_size=16)
+        assert mapping["key0"]["value"] == 0
+        requests = record_requests(mapping._client, "GetItem")
+        assert "key0" in mapping
+        assert "key0" in mapping.keys()
+        assert not requests
+
+
+def _generic_key_param(mapping: DynamoDBTableMapping, keys: Any) -> Any:
+    """The key parameters of the generic method, or the ValueError it raises."""
+    try:
+        return type(mapping)._create_key_param(mapping, keys)
+    except ValueError as e:
+        return type(e)
+
+
+def _specialized_key_param(mapping: DynamoDBTableMapping, keys: Any) -> Any:
+    try:
+        return mapping._create_key_param(keys)
+    except ValueError as e:
+        return type(e)
+
+
+class TestSpecializedKeyParams:
+
+    @pytest.mark.parametrize("keys", [
+        "a", 1, Decimal("1.5"), ("a",), (1,), ["a"], ("a", 1), (), [], StrKey("a"),
+    ])
+    def test_simple_keys_equal_the_generic_key_params(
+        self, make_mapping: MakeMapping, keys: Any
+    ) -> None:
+        mapping = make_mapping()
+        assert _specialized_key_param(mapping, keys) == _generic_key_param(mapping, keys)
+
+    @pytest.mark.parametrize("keys", [
+        ("a", 1), ["a", 1], ("a",), "a", ("a", 1, 2),
+    ])
+    def test_composite_keys_equal_the_generic_key_params(
+        self, make_mapping: MakeMapping, keys: Any
+    ) -> None:
+        mapping = make_mapping(composite=True)
+        assert _specialized_key_param(mapping, keys) == _generic_key_param(mapping, keys)
+
+    def test_binary_simple_keys(self, session: Any) -> None:
+        client = session.client("dynamodb")
+        client.create_table(
+            TableName="binary_table",
+            KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "pk", "AttributeType": "B"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        mapping = DynamoDBTableMapping("binary_table", boto3_session=session)
+        assert mapping._create_key_param(b"a") == {"pk": b"a"}
+        mapping[b"a"] = {"value": 1}
+        assert b"a" in mapping
+        assert mapping[b"a"]["value"] == 1
+        del mapping[b"a"]
+        assert b"a" not in mapping
+
+
+class TestKeyAttributes:
+
+    @pytest.mark.parametrize("item", [
+        {"value": 1}, {"pk": "a", "value": 1}, {"pk": "b", "value": 1}
+    ])
+    def test_set_item_writes_the_item_under_its_key(
+        self, make_mapping: MakeMapping, item: Dict[str, Any]
+    ) -> None:
+        mapping = make_mapping()
+        original = dict(item)
+        mapping.set_item("a", item)
+        assert item == original
+        assert dict(mapping.items()) == {"a": {"pk": "a", "value": 1}}
+
+    def test_update_writes_the_items_under_their_keys(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping()
+        items = {"a": {"pk": "a", "value": 1}, "b": {"pk": "c", "value": 2}}
+        mapping.update(items)
+        assert items["b"] == {"pk": "c", "value": 2}
+        assert dict(mapping.items()) == {
+            "a": {"pk": "a", "value": 1}, "b": {"pk": "b", "value": 2}
+        }
+
+
+class TestTableResource:
+
+    def test_the_resource_is_created_on_first_access(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=2)
+        mapping["new"] = {"value": 2}
+        assert len(list(mapping.values())) == 3
+        assert mapping._table is None
+        table = mapping.table
+        assert table.name == mapping.table_name
+        assert mapping.table is table
+
+
+class TestModifyItem:
+
+    def test_modifies_more_attributes_than_the_precomputed_placeholders(
+        self, make_mapping: MakeMapping
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        count = len(mapping_module._UPDATE_PLACEHOLDERS) + 2
+        mapping.modify_item("key0", {f"a{i}": i for i in range(count)})
+        assert mapping["key0"] == {"pk": "key0", "value": 0, **{f"a{i}": i for i in range(count)}}
+
+    def test_plain_updates_serialize_the_values(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1)
+        modifications = {
+            "name": "reserved word",
+            "map": {"n": 1, "l": [b"x", None]},
+            "set": {"a"},
+            "value": None,
+        }
+        mapping.modify_item("key0", modifications)
+        assert mapping["key0"] == {
+            "pk": "key0", "name": "reserved word", "map": {"n": 1, "l": [b"x", None]}, "set": {"a"}
+        }
+        assert modifications["map"] == {"n": 1, "l": [b"x", None]}
+
+    def test_updates_with_a_condition(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping(item_count=1)
+        mapping.modify_item("key0", {"value": 1}, ConditionExpression=Attr("value").eq(0))
+        with pytest.raises(mapping._client.exceptions.ConditionalCheckFailedException):
+            mapping.modify_item("key0", {"value": 2}, ConditionExpression=Attr("value").eq(0))
+        assert mapping["key0"]["value"] == 1
+
+    def test_empty_modifications_warn(
+        self, make_mapping: MakeMapping, record_requests: RecordRequests
+    ) -> None:
+        mapping = make_mapping(item_count=1)
+        requests = record_requests(mapping._client, "UpdateItem")
+        with pytest.warns(UserWarning):
+            mapping.modify_item("key0", {})
+        assert not requests
+
+
+ALL_TYPES_ITEM = {
+    "s": "x",
+    "n": Decimal("1.5"),
+    "b": b"x",
+    "bool": True,
+    "null": None,
+    "ss": {"a", "b"},
+    "ns": {1, 2},
+    "bs": {b"a"},
+    "l": [1, "x", [None]],
+    "m": {"n": {"m": {}}},
+}
+
+
+class TestWrittenItems:
+
+    @pytest.mark.parametrize("write", [
+        lambda mapping, item: mapping.set_item("key0", item),
+        lambda mapping, item: mapping.set_items([{"pk": "key0", **item}]),
+    ])
+    def test_all_attribute_types_are_written(
+        self, make_mapping: MakeMapping, write: Callable[[DynamoDBTableMapping, Any], None]
+    ) -> None:
+        mapping = make_mapping()
+        write(mapping, ALL_TYPES_ITEM)
+        assert mapping["key0"] == {"pk": "key0", **ALL_TYPES_ITEM}
+
+    def test_floats_are_rejected(self, make_mapping: MakeMapping) -> None:
+        mapping = make_mapping()
+        with pytest.raises(TypeError):
+            mapping.set_item("key0", {"value": 1.5})
+
+
+class TestScanParams:
+
+    @pytest.mark.parametrize("total_segments", [1, 3])
+    def test_filters_with_condition_objects(
+        self, make_mapping: MakeMapping, total_segments: int
+    ) -> None:
+        mapping = make_mapping(item_count=10)
+        items = mapping.scan(total_segments=total_segments, FilterExpression=Attr("value").lt(3))
+        assert sorted(item["value"] for item in items) == [0, 1, 2]
+
+    def test_unfiltered_scans_are_not_transformed(
+        self, make_mapping: MakeMapping, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        mapping = make_mapping(item_count=3)
+
+        def serialize_params(*args: Any) -> None:
+            raise AssertionError("Unexpected transformation")
+
+        monkeypatch.setattr(mapping, "_serialize_params", serialize_params)
+        assert len(list(mapping.scan(Limit=2))) == 3
+        assert sorted(mapping) == ["key0", "key1", "key2"]
@@ -0,0 +1,274 @@
+import json
+from decimal import Decimal
+from typing import Any, Callable, List, Tuple
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+from dynamodb_connection import DynamoDBConnection
+from dynamodb_connection import table_editor
+from dynamodb_connection.table_editor import DynamoDBTableEditor
+
+MakeConnection = Callable[..., DynamoDBConnection]
+
+
+@pytest.fixture(autouse=True)
+def clear_session_state() -> Any:
+    """The session state is shared by all tests, as they run outside of a Streamlit session."""
+    st.session_state.clear()
+    yield
+    st.session_state.clear()
+
+
+@pytest.fixture(params=["orjson", "json"])
+def json_module(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Runs the test with orjson, and with the json module of the standard library."""
+    if request.param == "json":
+        monkeypatch.setattr(table_editor, "orjson", None)
+    return request.param
+
+
+@pytest.fixture
+def connection(make_connection: MakeConnection) -> DynamoDBConnection:
+    """A connection to a table of two items with a list and a map attribute."""
+    connection = make_connection()
+    connection.put_item("a", {"value": 1, "tags": ["x"], "meta": {"n": 1}})
+    connection.put_item("b", {"value": 2, "tags": [], "meta": {"n": 2}})
+    return connection
+
+
+@pytest.fixture
+def writes(
+    connection: DynamoDBConnection, monkeypatch: pytest.MonkeyPatch
+) -> List[Tuple[str, Any]]:
+    """Records the write methods called on the connection and their first argument."""
+    writes: List[Tuple[str, Any]] = []
+
+    def recording(method_name: str) -> Callable[..., Any]:
+        method = getattr(connection, method_name)
+
+        def recording_method(*args: Any, **kwargs: Any) -> Any:
+            writes.append((method_name, args[0] if args else kwargs["keys"]))
+            return method(*args, **kwargs)
+
+        return recording_method
+
+    for method_name in ["put_item", "modify_item", "del_item"]:
+        monkeypatch.setattr(connection, method_name, recording(method_name))
+    return writes
+
+
+def _set_edit_info(editor: DynamoDBTableEditor, **edit_info: Any) -> None:
+    """Sets the edits of the data editor widget, as the frontend does on each rerun."""
+    st.session_state[editor.widget_key] = {
+        "edited_rows": {}, "added_rows": [], "deleted_rows": [], **edit_info
+    }
+
+
+class TestJSONColumns:
+
+    def test_serialized_columns_are_json_strings(self, json_module: str) -> None:
+        df = pd.DataFrame({"tags": [["x"], []], "meta": [{"n": 1}, {"n": 2}], "s": ["a", "b"]})
+        serialized = table_editor._serialize_json_cols(df.copy(), ["tags", "meta"])
+        assert [json.loads(value) for value in serialized["tags"]] == [["x"], []]
+        assert [json.loads(value) for value in serialized["meta"]] == [{"n": 1}, {"n": 2}]
+        assert serialized["s"].tolist() == ["a", "b"]
+
+    def test_deserialization_restores_the_columns(self, json_module: str) -> None:
+        df = pd.DataFrame({"tags": [["x"], []], "meta": [{"n": 1}, {"n": 2}]})
+        serialized = table_editor._serialize_json_cols(df.copy(), ["tags", "meta"])
+        assert table_editor._deserialize_json_cols(serialized, ["tags", "meta"]).equals(df)
+
+    def test_deserializes_the_cells_of_a_row(self, json_module: str) -> None:
+        row = {"tags": '["x"]', "s": "a"}
+        assert table_editor._deserialize_json_cols(row, ["tags", "meta"]) == {
+            "tags": ["x"], "s": "a"
+        }
+
+    def test_serializes_the_numbers_of_the_items(self, json_module: str) -> None:
+        df = pd.DataFrame({"meta": [{"n": Decimal(1), "f": Decimal("0.5")}]})
+        serialized = table_editor._serialize_json_cols(df, ["meta"])
+        assert json.loads(serialized["meta"].iat[0]) == {"n": 1, "f": 0.5}
+        assert table_editor._row_digest({"n": Decimal(1)}) == table_editor._row_digest({"n": 1})
+
+
+class TestJSONSerializableColumns:
+
+    def test_finds_the_columns_of_maps_and_lists(self) -> None:
+        df = pd.DataFrame({
+            "tags": [["x"], []],
+            "meta": [{"n": 1}, {"n": 2}],
+            "s": ["a", "b"],
+            "b": [b"a", b"b"],
+            "n": [1, 2],
+        })
+        assert table_editor._get_json_serializable_cols(df) == ["tags", "meta"]
+
+    def test_probes_the_first_cell(self) -> None:
+        df = pd.DataFrame({"tags": [["x"], "y"], "s": ["a", ["b"]]})
+        assert table_editor._get_json_serializable_cols(df) == ["tags"]
+
+    def test_empty_dataframe(self) -> None:
+        assert table_editor._get_json_serializable_cols(pd.DataFrame({"tags": []})) == []
+
+
+class TestRowDigest:
+
+    def test_does_not_depend_on_the_order_of_the_keys(self, json_module: str) -> None:
+        digest = table_editor._row_digest({"a": 1, "b": {"x": [1], "y": None}})
+        assert digest == table_editor._row_digest({"b": {"y": None, "x": [1]}, "a": 1})
+        assert len(digest) == 16
+
+    def test_depends_on_the_values(self, json_module: str) -> None:
+        assert table_editor._row_digest({"a": 1}) != table_editor._row_digest({"a": 2})
+        assert table_editor._row_digest({"a": 1}) != table_editor._row_digest({"b": 1})
+
+
+class TestProcessedRows:
+
+    def test_deleted_and_added_rows_are_processed_once(
+        self, connection: DynamoDBConnection, writes: List[Tuple[str, Any]]
+    ) -> None:
+        editor = DynamoDBTableEditor(connection)
+        for _ in range(3):
+            _set_edit_info(editor, added_rows=[{"_index": "c", "value": 3}], deleted_rows=[1])
+            editor.process_edits(editor.json_cols)
+        assert writes == [("put_item", "c"), ("del_item", "b")]
+        assert sorted(connection.mapping.keys()) == ["a", "c"]
+
+    def test_changed_added_rows_are_written_again(
+        self, connection: DynamoDBConnection, writes: List[Tuple[str, Any]]
+    ) -> None:
+        editor = DynamoDBTableEditor(connection)
+        for value in [3, 4, 4]:
+            _set_edit_info(editor, added_rows=[{"_index": "c", "value": value}])
+            editor.process_edits(editor.json_cols)
+        assert writes == [("put_item", "c"), ("put_item", "c")]
+        assert connection.mapping["c"]["value"] == 4
+
+
+class TestDeserialization:
+
+    def test_missing_cells_are_skipped(self, json_module: str) -> None:
+        df = pd.DataFrame({"tags": ['["x"]', None, float("nan")]})
+        deserialized = table_editor._deserialize_json_cols(df, ["tags"])
+        assert deserialized["tags"].iat[0] == ["x"]
+        assert deserialized["tags"].iloc[1:].isna().all()
+        assert table_editor._deserialize_json_cols({"tags": None}, ["tags"]) == {"tags": None}
+
+    @pytest.mark.parametrize("data", [
+        pd.DataFrame({"tags": ['["x"]', "[x"]}), {"tags": "[x"}
+    ])
+    def test_invalid_json_raises_json_error(self, json_module: str, data: Any) -> None:
+        with pytest.raises(table_editor.JSONError, match="'tags'"):
+            table_editor._deserialize_json_cols(data, ["tags"])
+
+
+class TestLoadItems:
+
+    def test_the_table_is_scanned_once_until_a_write(
+        self,
+        connection: DynamoDBConnection,
+        record_requests: Callable[[Any, str], List[Any]],
+    ) -> None:
+        requests = record_requests(connection.mapping._client, "Scan")
+        first = DynamoDBTableEditor(connection, key_prefix="first_")
+        second = DynamoDBTableEditor(connection, key_prefix="second_")
+        assert len(requests) == 1
+        assert first.df.equals(second.df)
+        write_count = connection.mapping.write_count
+        connection.put_item("c", {"value": 3})
+        assert connection.mapping.write_count > write_count
+        third = DynamoDBTableEditor(connection, key_prefix="third_")
+        assert len(requests) == 2
+        assert sorted(third.df.index) == ["a", "b", "c"]
+
+    def test_the_table_is_loaded_once_per_session(self, connection: DynamoDBConnection) -> None:
+        editor = DynamoDBTableEditor(connection)
+        connection.put_item("c", {"value": 3})
+        assert DynamoDBTableEditor(connection).df is editor.df
+        assert sorted(editor.df.index) == ["a", "b"]
+
+
+class TestEdit:
+
+    def test_does_not_modify_the_loaded_table(self, connection: DynamoDBConnection) -> None:
+        editor = DynamoDBTableEditor(connection)
+        loaded = editor.df.copy(deep=True)
+        edited = editor.edit()
+        assert editor.df.equals(loaded)
+        assert editor.df["tags"].tolist() == [["x"], []]
+        assert edited["meta"].tolist() == [{"n": 1}, {"n": 2}]
+
+
+class TestEditedRows:
+
+    def test_edited_rows_are_written_to_the_item_at_their_position(
+        self, connection: DynamoDBConnection, writes: List[Tuple[str, Any]]
+    ) -> None:
+        editor = DynamoDBTableEditor(connection)
+        for _ in range(2):
+            _set_edit_info(
+                editor, edited_rows={1: {"value": 20, "tags": '["y"]'}, 0: {"meta": None}}
+            )
+            editor.process_edits(editor.json_cols)
+        assert sorted(writes) == [("modify_item", "a"), ("modify_item", "b")]
+        assert connection.mapping["a"] == {"pk": "a", "value": 1, "tags": ["x"]}
+        assert connection.mapping["b"] == {"pk": "b", "value": 20, "tags": ["y"], "meta": {"n": 2}}
+
+    def test_edited_rows_are_written_again_when_changed(
+        self, connection: DynamoDBConnection, writes: List[Tuple[str, Any]]
+    ) -> None:
+        editor = DynamoDBTableEditor(connection)
+        for value in [10, 11]:
+            _set_edit_info(editor, edited_rows={0: {"value": value}})
+            editor.process_edits(editor.json_cols)
+        assert writes == [("modify_item", "a"), ("modify_item", "a")]
+        assert connection.mapping["a"]["value"] == 11
+
+
+class TestJSONColumnsCache:
+
+    def test_json_cols_are_inspected_once_per_schema(
+        self, connection: DynamoDBConnection, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        inspected: List[pd.DataFrame] = []
+
+        def get_json_serializable_cols(df: pd.DataFrame) -> List[str]:
+            inspected.append(df)
+            return get_cols(df)
+
+        get_cols = table_editor._get_json_serializable_cols
+        monkeypatch.setattr(
+            table_editor, "_get_json_serializable_cols", get_json_serializable_cols
+        )
+        editor = DynamoDBTableEditor(connection)
+        assert editor.json_cols == ["tags", "meta"]
+        assert DynamoDBTableEditor(connection).json_cols == ["tags", "meta"]
+        assert len(inspected) == 1
+        editor.df = editor.df.assign(other=[["z"], ["w"]])
+        assert editor.json_cols == ["tags", "meta", "other"]
+        assert len(inspected) == 2
+
+
+class TestNoEdits:
+
+    @pytest.mark.parametrize("widget_state", [None, {}])
+    def test_nothing_is_written_without_edits(
+        self,
+        connection: DynamoDBConnection,
+        monkeypatch: pytest.MonkeyPatch,
+        widget_state: Any,
+    ) -> None:
+        editor = DynamoDBTableEditor(connection)
+        if widget_state is not None:
+            _set_edit_info(editor, **widget_state)
+
+        def fail(*args: Any, **kwargs: Any) -> None:
+            raise AssertionError("Unexpected write")
+
+        for method_name in ["put_item", "modify_item", "del_item"]:
+            monkeypatch.setattr(connection, method_name, fail)
+        editor.process_edits(editor.json_cols)
+        assert editor.processed_edits_key not in st.session_state
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict
+
+import boto3
+import pytest
+from boto3.dynamodb.types import TypeDeserializer
+from dynamodb_mapping.dynamodb_mapping import create_tuple_keys as mapping_create_tuple_keys
+
+from dynamodb_connection import utils
+
+
+class TestSharedSessions:
+
+    def test_the_default_session_is_created_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(utils, "_DEFAULT_SESSION", None)
+        session = utils.get_default_session()
+        assert isinstance(session, boto3.Session)
+        assert utils.get_default_session() is session
+
+    def test_the_resource_is_created_once_per_session(self, session: Any) -> None:
+        resource = utils.get_dynamodb_resource(session)
+        assert utils.get_dynamodb_resource(session) is resource
+        other_session = boto3.Session(region_name=session.region_name)
+        assert utils.get_dynamodb_resource(other_session) is not resource
+
+    def test_the_clients_are_created_once_per_pool_size(self, session: Any) -> None:
+        client = utils.get_dynamodb_client(session)
+        assert utils.get_dynamodb_client(session) is client
+        assert utils.get_dynamodb_client(session, 20) is not client
+        assert utils.get_dynamodb_client(session, 20) is utils.get_dynamodb_client(session, 20)
+
+
+def _config(access_key_id: str = "id", secret_access_key: str = "secret") -> Dict[str, Any]:
+    return {
+        "aws_access_key_id": access_key_id,
+        "aws_secret_access_key": secret_access_key,
+        "aws_region": "eu-west-1",
+    }
+
+
+class TestConfigSessions:
+
+    @pytest.fixture(autouse=True)
+    def config_sessions(self, monkeypatch: pytest.MonkeyPatch) -> Any:
+        monkeypatch.setattr(utils, "_CONFIG_SESSIONS", OrderedDict())
+        return utils._CONFIG_SESSIONS
+
+    def test_sessions_are_reused_for_the_same_config(self) -> None:
+        session = utils.boto3_session_from_config(_config())
+        assert session is not None
+        assert session.get_credentials().access_key == "id"
+        assert session.region_name == "eu-west-1"
+        assert utils.boto3_session_from_config(_config()) is session
+        assert utils.boto3_session_from_config({
+            key.upper(): value for key, value in _config().items()
+        }) is session
+
+    def test_sessions_are_not_keyed_by_the_secret(self, config_sessions: Dict) -> None:
+        utils.boto3_session_from_config(_config())
+        assert not any("secret" in key for key in config_sessions)
+
+    def test_sessions_are_replaced_when_the_secret_changes(self) -> None:
+        session = utils.boto3_session_from_config(_config())
+        rotated = utils.boto3_session_from_config(_config(secret_access_key="rotated"))
+        assert rotated is not session
+        assert rotated.get_credentials().secret_key == "rotated"
+        assert utils.boto3_session_from_config(_config(secret_access_key="rotated")) is rotated
+
+    def test_only_the_recently_used_sessions_are_kept(
+        self, config_sessions: Dict, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(utils, "_CONFIG_SESSIONS_SIZE", 2)
+        first = utils.boto3_session_from_config(_config("first"))
+        utils.boto3_session_from_config(_config("second"))
+        assert utils.boto3_session_from_config(_config("first")) is first
+        utils.boto3_session_from_config(_config("third"))
+        assert [key[0] for key in config_sessions] == ["first", "third"]
+
+    def test_no_session_without_credentials(self) -> None:
+        assert utils.boto3_session_from_config({"aws_region": "eu-west-1"}) is None
+        assert utils.boto3_session_from_config({"aws_access_key_id": "id"}) is None
+
+
+class TestClientConfig:
+
+    def test_clients_keep_alive_and_retry_adaptively(self, session: Any) -> None:
+        config = utils.get_dynamodb_client(session, 16).meta.config
+        assert config.max_pool_connections == 16
+        assert config.tcp_keepalive is True
+        assert config.retries["mode"] == "adaptive"
+
+    def test_the_resource_is_configured_like_the_clients(self, session: Any) -> None:
+        config = utils.get_dynamodb_resource(session).meta.client.meta.config
+        assert config.tcp_keepalive is True
+        assert config.retries["mode"] == "adaptive"
+
+
+class StrKey(str):
+    pass
+
+
+class TestCreateTupleKeys:
+
+    @pytest.mark.parametrize("key", [
+        "a", 1, Decimal("1.5"), b"a", bytearray(b"a"), StrKey("a"), ("a", 1), ["a", 1], ("a",),
+        {"a"}, None, 1.5,
+    ])
+    def test_equals_the_key_of_dynamodb_mapping(self, key: Any) -> None:
+        assert utils.create_tuple_keys(key) == mapping_create_tuple_keys(key)
+
+    def test_tuples_are_returned_as_they_are(self) -> None:
+        key = ("a", 1)
+        assert utils.create_tuple_keys(key) is key
+
+
+class TestDeserializer:
+
+    @pytest.mark.parametrize("value", [
+        {"S": "a"},
+        {"N": "1.50"},
+        {"BOOL": False},
+        {"NULL": True},
+        {"B": b"a"},
+        {"SS": ["a", "b"]},
+        {"NS": ["1", "2.5"]},
+        {"BS": [b"a"]},
+        {"L": [{"S": "a"}, {"N": "1"}, {"L": []}]},
+        {"M": {"a": {"M": {"b": {"NULL": True}}}, "c": {"SS": ["x"]}}},
+    ])
+    def test_equals_the_type_deserializer(self, value: Dict[str, Any]) -> None:
+        expected = TypeDeserializer().deserialize(value)
+        assert utils.DynamoDBDeserializer().deserialize(value) == expected
+
+    def test_raises_on_invalid_values(self) -> None:
+        with pytest.raises(TypeError):
+            utils.DynamoDBDeserializer().deserialize({"X": "a"})
+
+    def test_deserializes_items(self) -> None:
+        item = {"pk": {"S": "a"}, "value": {"N": "1"}}
+        assert utils.DynamoDBDeserializer().deserialize_item(item) == {
+            "pk": "a", "value": Decimal(1)
+        }